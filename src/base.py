@@ -1,33 +1,93 @@
-import logging 
-import os 
+import atexit
+import logging
+import logging.handlers
+import multiprocessing.util
+import os
+import queue
+import threading
 LOG_FOLDER_PATH = os.path.join(os.path.dirname(__file__), 'log')
+LOG_FORMAT = "[%(prefix)s - %(filename)s:%(lineno)s - %(funcName)3s() ] %(message)s"
+
+# Handlers are registered once per logger name (not once per object), and
+# file output for each name goes through a QueueHandler drained by its own
+# QueueListener thread so the factoring thread never blocks on disk.
+_configured_loggers = {}  # logger name -> (QueueHandler, QueueListener)
+_logging_lock = threading.Lock()
+
+
+def _stop_listeners():
+    """ Flush and stop every file listener (registered with atexit, and as a
+    multiprocessing finalizer in forked children). Safe to call twice. """
+    for _, listener in _configured_loggers.values():
+        # QueueListener.stop() is not idempotent before Python 3.12
+        if listener._thread is not None:
+            listener.stop()
+
+
+def _restart_listeners_after_fork():
+    """ Listener threads do not survive fork(), so give each logger in the child
+    (e.g. a process pool worker) a fresh queue and a running listener. """
+    global _logging_lock
+    _logging_lock = threading.Lock()
+    for name, (queue_handler, listener) in list(_configured_loggers.items()):
+        queue_handler.queue = queue.SimpleQueue()
+        # the parent's listener object still thinks its thread is running, so build
+        # a new one draining the new queue into the same file handlers
+        listener = logging.handlers.QueueListener(
+            queue_handler.queue, *listener.handlers, respect_handler_level=listener.respect_handler_level)
+        listener.start()
+        _configured_loggers[name] = (queue_handler, listener)
+
+
+atexit.register(_stop_listeners)
+# multiprocessing children (e.g. ProcessPoolExecutor workers) leave through
+# os._exit(), which skips atexit, but they do run multiprocessing's finalizers.
+# Those are cleared when the child starts, so register ours from an after-fork hook.
+multiprocessing.util.register_after_fork(
+    _stop_listeners, lambda stop: multiprocessing.util.Finalize(None, stop, exitpriority=0))
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listeners_after_fork)
+
+
 class Base:
     def __init__(self, name: str = '', verbose: bool = False):
-        self.name = name 
+        self.name = name
+        self.prefix = name  # tag on every log line; subclasses may make it more specific than the logger name
         self.verbose = verbose
         self.setup_logging()
+
     def setup_logging(self):
-        """ set up self.logger for Driver logging """ 
+        """ set up self.logger for Driver logging. Handlers are only attached the
+        first time a logger name is seen, so building many objects with the same
+        name (e.g. solvers in a batch run) never duplicates output. """
         self.logger = logging.getLogger(self.name)
-        format = "[%(prefix)s - %(filename)s:%(lineno)s - %(funcName)3s() ] %(message)s"
-        formatter = logging.Formatter(format)
-        handlerStream = logging.StreamHandler()
-        handlerStream.setFormatter(formatter) 
-        self.logger.addHandler(handlerStream)  
-        os.makedirs(LOG_FOLDER_PATH, exist_ok=True) 
-        handlerFile = logging.FileHandler(f'{LOG_FOLDER_PATH}/{self.name}.log')
-        handlerFile.setFormatter(formatter) 
-        self.logger.addHandler(handlerFile)  
+        with _logging_lock:
+            if self.name not in _configured_loggers:
+                formatter = logging.Formatter(LOG_FORMAT)
+                handlerStream = logging.StreamHandler()
+                handlerStream.setFormatter(formatter)
+                self.logger.addHandler(handlerStream)
+                os.makedirs(LOG_FOLDER_PATH, exist_ok=True)
+                handlerFile = logging.FileHandler(f'{LOG_FOLDER_PATH}/{self.name}.log')
+                handlerFile.setFormatter(formatter)
+                handlerQueue = logging.handlers.QueueHandler(queue.SimpleQueue())
+                listener = logging.handlers.QueueListener(handlerQueue.queue, handlerFile)
+                listener.start()
+                self.logger.addHandler(handlerQueue)
+                _configured_loggers[self.name] = (handlerQueue, listener)
         if self.verbose:
-            self.logger.setLevel(logging.DEBUG) 
+            self.logger.setLevel(logging.DEBUG)
         else:
             self.logger.setLevel(logging.INFO)
 
-    def debug(self, msg):
-        self.logger.debug(msg, extra={'prefix': self.name}, stacklevel=2)
+    # Messages use logging's lazy %-style formatting: pass the arguments
+    # separately, e.g. self.info('g=%s', g), and the string is only built
+    # when the level is enabled.
+    def debug(self, msg, *args):
+        self.logger.debug(msg, *args, extra={'prefix': self.prefix}, stacklevel=2)
 
-    def info(self, msg):
-        self.logger.info(msg, extra={'prefix': self.name}, stacklevel=2)
+    def info(self, msg, *args):
+        self.logger.info(msg, *args, extra={'prefix': self.prefix}, stacklevel=2)
 
-    def error(self, msg):
-        self.logger.error(msg, extra={'prefix': self.name}, stacklevel=2)
\ No newline at end of file
+    def error(self, msg, *args):
+        self.logger.error(msg, *args, extra={'prefix': self.prefix}, stacklevel=2)
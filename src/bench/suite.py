@@ -0,0 +1,286 @@
+""" Benchmark suite for the factoring solvers.
+
+Runs each solver over a semiprime corpus with warm-up and repetitions,
+timing every factor() call with perf_counter_ns, and records attempts,
+simulator calls and peak RSS. Results are summarized as p50/p95/p99 per
+bit length, written as JSON/CSV, and can be compared against a saved
+baseline to flag regressions, e.g.
+
+    python -m bench.suite --solvers classical dispatcher --bits 16 20 24 \
+        --json bench.json --baseline baseline.json
+
+--imports additionally measures the import time of the entry points with
+`python -X importtime` in fresh interpreters, and flags any of them that
+pulls in Qiskit or matplotlib.
+"""
+import argparse
+import csv
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from base import Base
+from registry import SOLVER_NAMES, build_solver
+
+# columns of the raw per-run records
+RECORD_FIELDS = [
+    'solver', 'N', 'bits', 'repetition', 'elapsed_ns', 'attempts',
+    'simulator_calls', 'peak_rss_kb', 'success',
+]
+
+# entry points whose import time is tracked with --imports
+IMPORT_CHECK_MODULES = ('main', 'cli', 'classical.solver', 'qskt.solver')
+# packages that must only be imported when the Qiskit solver or plotting is used
+HEAVY_MODULES = ('qiskit', 'qiskit_aer', 'matplotlib')
+SRC_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: list = None, q: float = 50):
+    """ q-th percentile of values with linear interpolation between closest
+    ranks (the same definition as numpy.percentile's default). """
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    k = (len(ordered) - 1) * q / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def peak_rss_kb():
+    """ Peak resident set size of this process in KiB (ru_maxrss is bytes on macOS). """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def measure_import(module: str = 'main', runs: int = 3):
+    """ Import `module` in `runs` fresh interpreters with -X importtime and return
+    (best cumulative import time in ms, sorted heavy packages it imported). """
+    best, heavy = None, set()
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=SRC_PATH, capture_output=True, text=True, check=True)
+        cumulative = None
+        for line in proc.stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            fields = line[len('import time:'):].split('|')
+            if len(fields) != 3 or not fields[1].strip().isdigit():
+                continue  # header line
+            name = fields[2].strip()
+            if name.split('.')[0] in HEAVY_MODULES:
+                heavy.add(name.split('.')[0])
+            if name == module:
+                cumulative = int(fields[1]) / 1000
+        if cumulative is not None and (best is None or cumulative < best):
+            best = cumulative
+    return best, sorted(heavy)
+
+
+class BenchmarkSuite(Base):
+    def __init__(self, name: str = 'Benchmark', verbose: bool = False,
+                 warmup: int = 1, repetitions: int = 5):
+        """ warmup untimed factor() calls per solver are made before measuring,
+        then every semiprime in the corpus is factored `repetitions` times. """
+        super().__init__(name, verbose)
+        self.warmup = warmup
+        self.repetitions = repetitions
+        self.records = []
+        self.imports = {}
+
+    def run_solver(self, solver: Base = None, corpus: list = []):
+        """ Benchmark one solver over the corpus, appending to and returning its records. """
+        for N in corpus[:1] * self.warmup:
+            solver.factor(N)
+        records = []
+        for repetition in range(self.repetitions):
+            for N in corpus:
+                start = time.perf_counter_ns()
+                result = solver.factor(N)
+                elapsed_ns = time.perf_counter_ns() - start
+                factors = result.get('factors') or {}
+                records.append({
+                    'solver': solver.name,
+                    'N': N,
+                    'bits': N.bit_length(),
+                    'repetition': repetition,
+                    'elapsed_ns': elapsed_ns,
+                    'attempts': result.get('attempts'),
+                    'simulator_calls': result.get('simulator_calls'),
+                    'peak_rss_kb': peak_rss_kb(),
+                    'success': factors.get('p') not in (None, 1, N),
+                })
+        self.info('solver=%s: %s runs over %s semiprimes', solver.name, len(records), len(corpus))
+        self.records.extend(records)
+        return records
+
+    def run_import_checks(self, modules: tuple = IMPORT_CHECK_MODULES, runs: int = 3):
+        """ Measure the import time of each module (see measure_import). """
+        for module in modules:
+            import_ms, heavy = measure_import(module, runs=runs)
+            self.imports[module] = {'import_ms': import_ms, 'heavy_modules': heavy}
+            self.info('import %s: %.1f ms, heavy modules: %s', module, import_ms, heavy or 'none')
+        return self.imports
+
+    def run(self, solvers: list = [], corpus: list = []):
+        """ Benchmark every solver over the same corpus and return the summary. """
+        for solver in solvers:
+            self.run_solver(solver=solver, corpus=corpus)
+        return self.summary()
+
+    def summary(self):
+        """ Per (solver, bit length) latency percentiles in milliseconds plus
+        attempt and simulator call means, keyed 'solver/bits'. """
+        groups = {}
+        for record in self.records:
+            groups.setdefault((record['solver'], record['bits']), []).append(record)
+        summary = {}
+        for (solver, bits), records in sorted(groups.items()):
+            elapsed_ms = [r['elapsed_ns'] / 1e6 for r in records]
+            attempts = [r['attempts'] for r in records if r['attempts'] is not None]
+            calls = [r['simulator_calls'] for r in records if r['simulator_calls'] is not None]
+            summary[f'{solver}/{bits}'] = {
+                'solver': solver,
+                'bits': bits,
+                'runs': len(records),
+                'p50_ms': percentile(elapsed_ms, 50),
+                'p95_ms': percentile(elapsed_ms, 95),
+                'p99_ms': percentile(elapsed_ms, 99),
+                'mean_attempts': sum(attempts) / len(attempts) if attempts else None,
+                'mean_simulator_calls': sum(calls) / len(calls) if calls else None,
+                'peak_rss_kb': max(r['peak_rss_kb'] for r in records),
+                'success_rate': sum(r['success'] for r in records) / len(records),
+            }
+        return summary
+
+    def write_json(self, path: str = 'benchmark.json'):
+        """ Write the summary and the raw records as JSON. """
+        with open(path, 'w') as f:
+            json.dump({'summary': self.summary(), 'records': self.records,
+                       'imports': self.imports}, f, indent=2)
+
+    def write_csv(self, path: str = 'benchmark.csv'):
+        """ Write the raw per-run records as CSV. """
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RECORD_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.records)
+
+    def compare_to_baseline(self, baseline_path: str = None, threshold: float = 0.2,
+                            metrics: tuple = ('p50_ms', 'p95_ms')):
+        """ Compare the current summary against a JSON file written by write_json.
+        Returns a list of regressions: every (solver, bits, metric) that got slower
+        than the baseline by more than `threshold` (0.2 = 20%), and every measured
+        import (see run_import_checks) that got slower by as much. A module that
+        imports one of HEAVY_MODULES is always reported. """
+        with open(baseline_path) as f:
+            saved = json.load(f)
+        baseline = saved['summary']
+        regressions = []
+        for key, current in self.summary().items():
+            if key not in baseline:
+                continue
+            for metric in metrics:
+                before, after = baseline[key][metric], current[metric]
+                if before and after > before * (1 + threshold):
+                    regressions.append({
+                        'key': key,
+                        'metric': metric,
+                        'baseline': before,
+                        'current': after,
+                        'ratio': after / before,
+                    })
+        for module, current in self.imports.items():
+            before = saved.get('imports', {}).get(module, {}).get('import_ms')
+            after = current['import_ms']
+            if before and after > before * (1 + threshold):
+                regressions.append({
+                    'key': f'import/{module}',
+                    'metric': 'import_ms',
+                    'baseline': before,
+                    'current': after,
+                    'ratio': after / before,
+                })
+            if current['heavy_modules']:
+                self.error('REGRESSION import/%s pulls in %s', module, ', '.join(current['heavy_modules']))
+                regressions.append({
+                    'key': f'import/{module}',
+                    'metric': 'heavy_modules',
+                    'baseline': [],
+                    'current': current['heavy_modules'],
+                })
+        for regression in regressions:
+            if regression['metric'] == 'heavy_modules':
+                continue
+            self.error('REGRESSION %s %s: %.3f -> %.3f ms (x%.2f)', regression['key'],
+                       regression['metric'], regression['baseline'], regression['current'],
+                       regression['ratio'])
+        return regressions
+
+
+def build_corpus(bits: list = [], per_bits: int = 10, seed: int = None):
+    """ Distinct balanced semiprimes, per_bits of each requested bit length. """
+    from utils.semiprimes import SemiPrimeGenerator
+    generator = SemiPrimeGenerator(seed=seed)
+    corpus = []
+    for b in bits:
+        corpus.extend(generator.get_n_semiprimes(
+            num_semiprimes=per_bits, bits=b, distinct=True, exclude_squares=True))
+    return corpus
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description='Benchmark the factoring solvers.')
+    parser.add_argument('--solvers', nargs='+', default=['classical'],
+                        help=', '.join(SOLVER_NAMES))
+    parser.add_argument('--bits', nargs='+', type=int, default=[12, 16, 20])
+    parser.add_argument('--per-bits', type=int, default=10)
+    parser.add_argument('--corpus', help='file with one N per line (overrides --bits)')
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--repetitions', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write summary + records as JSON')
+    parser.add_argument('--csv', help='write raw records as CSV')
+    parser.add_argument('--baseline', help='JSON from a previous run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative slowdown that counts as a regression')
+    parser.add_argument('--imports', nargs='*', metavar='MODULE',
+                        help='also measure import times (default modules: %s)'
+                        % ', '.join(IMPORT_CHECK_MODULES))
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+    if args.baseline and not os.path.exists(args.baseline):
+        # checked before benchmarking so a typo does not silently skip the comparison
+        parser.error(f'baseline file {args.baseline!r} does not exist')
+
+    if args.corpus:
+        with open(args.corpus) as f:
+            corpus = [int(line) for line in f if line.strip()]
+    else:
+        corpus = build_corpus(bits=args.bits, per_bits=args.per_bits, seed=args.seed)
+    suite = BenchmarkSuite(verbose=args.verbose, warmup=args.warmup, repetitions=args.repetitions)
+    summary = suite.run(
+        solvers=[build_solver(name, verbose=args.verbose, seed=args.seed) for name in args.solvers],
+        corpus=corpus,
+    )
+    if args.imports is not None:
+        suite.run_import_checks(modules=tuple(args.imports) or IMPORT_CHECK_MODULES)
+    for key, row in summary.items():
+        print(f'{key:<32} runs={row["runs"]:<5} p50={row["p50_ms"]:.3f}ms '
+              f'p95={row["p95_ms"]:.3f}ms p99={row["p99_ms"]:.3f}ms '
+              f'attempts={row["mean_attempts"]} rss={row["peak_rss_kb"]}KiB')
+    if args.json:
+        suite.write_json(args.json)
+    if args.csv:
+        suite.write_csv(args.csv)
+    if args.baseline:
+        if suite.compare_to_baseline(args.baseline, threshold=args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+""" Strategy layer for classical factoring. Picks a back-end from
+classical/engines.py by the bit length of N so Driver.run_implementation
+has a fast classical baseline to compare the order-finding solvers against.
+"""
+import time
+from math import isqrt
+from base import Base
+from utils.primes import is_probable_prime
+from .engines import TrialDivisionFactorization, PollardBrentFactorization, ECMFactorization
+
+
+class ClassicalFactoringDispatcher(Base):
+    def __init__(self, name: str = 'ClassicalDispatcher', verbose: bool = False,
+                 trial_division_max_bits: int = 32, rho_max_bits: int = 80):
+        """ N up to trial_division_max_bits bits goes to trial division,
+        N up to rho_max_bits bits goes to Pollard-Brent rho, and anything
+        larger goes to ECM. """
+        super().__init__(name, verbose)
+        self.trial_division_max_bits = trial_division_max_bits
+        self.rho_max_bits = rho_max_bits
+        self.engines = {
+            'trial_division': TrialDivisionFactorization(verbose=verbose),
+            'pollard_brent': PollardBrentFactorization(verbose=verbose),
+            'ecm': ECMFactorization(verbose=verbose),
+        }
+
+    def select_engine(self, N: int = None):
+        """ Return the engine name for N based on its bit length. """
+        bits = N.bit_length()
+        if bits <= self.trial_division_max_bits:
+            return 'trial_division'
+        if bits <= self.rho_max_bits:
+            return 'pollard_brent'
+        return 'ecm'
+
+    def factor(self, N: int = None):
+        """ Factor N with whichever engine suits its size. Even N, perfect
+        squares and primes are answered up front without an engine. """
+        start = time.time()
+        if N % 2 == 0:
+            factors = {'p': 2, 'q': N // 2}
+        elif isqrt(N) ** 2 == N:
+            factors = {'p': isqrt(N), 'q': isqrt(N)}
+        elif is_probable_prime(N):
+            factors = {'p': N, 'q': 1}
+        else:
+            engine = self.select_engine(N)
+            self.info('N=%s (%s bits) -> engine=%s', N, N.bit_length(), engine)
+            result = self.engines[engine].factor(N)
+            result['engine'] = engine
+            return result
+        return {
+            'N': N,
+            'factors': factors,
+            'elapsed_seconds': round(time.time() - start, 6),
+            'attempts': 1
+        }
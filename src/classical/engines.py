@@ -0,0 +1,242 @@
+""" Classical factoring back-ends used by the strategy dispatcher
+(classical/dispatcher.py) as a fast baseline for semiprimes far beyond
+what order finding can handle.
+
+Every engine exposes factor(N) and returns the same result dict as the
+other solvers in this project:
+    {'N': N, 'factors': {'p': p, 'q': q}, 'elapsed_seconds': s, 'attempts': a}
+"""
+import time
+from math import gcd, isqrt
+from random import randrange
+from base import Base
+from utils.primes import small_primes, is_probable_prime
+
+
+class TrialDivisionFactorization(Base):
+    """ Trial division by the cached small-prime table. Only sensible for
+    small N, but it has no randomness and no setup cost. """
+
+    def __init__(self, name: str = 'TrialDivision', verbose: bool = False):
+        super().__init__(name, verbose)
+
+    def factor(self, N: int = None):
+        start = time.time()
+        factors = {'p': N, 'q': 1}
+        attempts = 0
+        for p in small_primes(isqrt(N) + 1):
+            attempts += 1
+            if N % p == 0:
+                factors = {'p': p, 'q': N // p}
+                break
+        elapsed = round(time.time() - start, 6)
+        return {
+            'N': N,
+            'factors': factors,
+            'elapsed_seconds': elapsed,
+            'attempts': attempts
+        }
+
+
+class PollardBrentFactorization(Base):
+    """ Pollard's rho with Brent's cycle detection. Expected O(N^(1/4))
+    iterations to find a factor of a balanced semiprime. Gcds are batched
+    over `batch_size` steps so the expensive gcd runs rarely. """
+
+    def __init__(self, name: str = 'PollardBrent', verbose: bool = False,
+                 batch_size: int = 128, max_attempts: int = 64):
+        super().__init__(name, verbose)
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+
+    def brent(self, N: int = None, c: int = 1, y: int = 2):
+        """ One run of Brent's variant of rho for f(x) = x^2 + c mod N.
+        Returns a divisor of N (possibly N itself when the run fails). """
+        m = self.batch_size
+        g, r, q = 1, 1, 1
+        x = ys = y
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % N
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _ in range(min(m, r - k)):
+                    y = (y * y + c) % N
+                    q = (q * abs(x - y)) % N
+                g = gcd(q, N)
+                k += m
+            r *= 2
+        if g == N:
+            # the batched product overshot; backtrack one step at a time
+            g = 1
+            while g == 1:
+                ys = (ys * ys + c) % N
+                g = gcd(abs(x - ys), N)
+        return g
+
+    def factor(self, N: int = None):
+        start = time.time()
+        factors = None
+        attempts = 0
+        if N % 2 == 0:
+            factors = {'p': 2, 'q': N // 2}
+        while factors is None and attempts < self.max_attempts:
+            attempts += 1
+            c, y = randrange(1, N - 1), randrange(0, N - 1)
+            self.debug('attempt=%s, c=%s, y=%s', attempts, c, y)
+            d = self.brent(N=N, c=c, y=y)
+            if d not in (1, N):
+                factors = {'p': d, 'q': N // d}
+        elapsed = round(time.time() - start, 6)
+        return {
+            'N': N,
+            'factors': factors,
+            'elapsed_seconds': elapsed,
+            'attempts': attempts
+        }
+
+
+class _FactorFound(Exception):
+    """ Raised from inside the elliptic curve arithmetic when a modular
+    inversion fails, which is exactly how ECM discovers a factor. """
+
+    def __init__(self, divisor: int = None):
+        super().__init__(divisor)
+        self.divisor = divisor
+
+
+class ECMFactorization(Base):
+    """ Lenstra's elliptic curve method on random Weierstrass curves
+    y^2 = x^3 + a*x + b (mod N) in affine coordinates.
+
+    Stage 1 multiplies a point by every prime power <= B1. Stage 2 then
+    walks through the primes q in (B1, B2], adding precomputed multiples of
+    the stage 1 point for each prime gap. A factor shows up as a failed
+    modular inversion during a point addition.
+    """
+
+    def __init__(self, name: str = 'ECM', verbose: bool = False,
+                 B1: int = None, B2: int = None, max_curves: int = 2000):
+        super().__init__(name, verbose)
+        self.B1 = B1
+        self.B2 = B2
+        self.max_curves = max_curves
+
+    @staticmethod
+    def bounds_for(N: int = None):
+        """ Stage 1/2 bounds for the expected factor size of a balanced
+        semiprime, roughly following the usual GMP-ECM table. """
+        factor_digits = len(str(isqrt(N)))
+        if factor_digits <= 10:
+            B1 = 360
+        elif factor_digits <= 15:
+            B1 = 2000
+        elif factor_digits <= 20:
+            B1 = 11000
+        elif factor_digits <= 25:
+            B1 = 50000
+        else:
+            B1 = 250000
+        return B1, 100 * B1
+
+    @staticmethod
+    def _inverse(d: int = None, N: int = None):
+        try:
+            return pow(d, -1, N)
+        except ValueError:
+            raise _FactorFound(gcd(d, N)) from None
+
+    def _add(self, P, Q, a: int = None, N: int = None):
+        """ Affine point addition; None is the point at infinity. """
+        if P is None:
+            return Q
+        if Q is None:
+            return P
+        x1, y1 = P
+        x2, y2 = Q
+        if x1 == x2:
+            if (y1 + y2) % N == 0:
+                return None
+            lam = (3 * x1 * x1 + a) * self._inverse(2 * y1 % N, N) % N
+        else:
+            lam = (y2 - y1) * self._inverse((x2 - x1) % N, N) % N
+        x3 = (lam * lam - x1 - x2) % N
+        return (x3, (lam * (x1 - x3) - y1) % N)
+
+    def _multiply(self, k: int = None, P=None, a: int = None, N: int = None):
+        """ Double-and-add scalar multiplication k*P. """
+        R = None
+        while k > 0:
+            if k & 1:
+                R = self._add(R, P, a, N)
+            k >>= 1
+            if k:
+                P = self._add(P, P, a, N)
+        return R
+
+    def run_curve(self, N: int = None, B1: int = None, B2: int = None):
+        """ Run stage 1 and stage 2 on one random curve. Returns a divisor
+        of N, or None if the curve did not produce one. """
+        x, y, a = randrange(N), randrange(N), randrange(N)
+        b = (y * y - x * x * x - a * x) % N
+        d = gcd(4 * a ** 3 + 27 * b * b, N)
+        if d == N:
+            return None  # singular curve
+        if d > 1:
+            return d
+        P = (x, y)
+        primes = small_primes(B2 + 1)
+        try:
+            # stage 1: P <- (prod of p^e <= B1) * P
+            for p in primes:
+                if p > B1:
+                    break
+                pe = p
+                while pe * p <= B1:
+                    pe *= p
+                P = self._multiply(pe, P, a, N)
+                if P is None:
+                    return None
+            # stage 2: visit q*P for every prime B1 < q <= B2
+            stage2 = [q for q in primes if q > B1]
+            if not stage2:
+                return None
+            gaps = {}
+            R = self._multiply(stage2[0], P, a, N)
+            for prev, q in zip(stage2, stage2[1:]):
+                gap = q - prev
+                if gap not in gaps:
+                    gaps[gap] = self._multiply(gap, P, a, N)
+                R = self._add(R, gaps[gap], a, N)
+                if R is None:
+                    return None
+        except _FactorFound as found:
+            if found.divisor not in (1, N):
+                return found.divisor
+        return None
+
+    def factor(self, N: int = None):
+        start = time.time()
+        factors = None
+        attempts = 0
+        B1, B2 = self.bounds_for(N)
+        B1, B2 = self.B1 or B1, self.B2 or B2
+        if N % 2 == 0:
+            factors = {'p': 2, 'q': N // 2}
+        elif is_probable_prime(N):
+            factors = {'p': N, 'q': 1}
+        while factors is None and attempts < self.max_curves:
+            attempts += 1
+            self.debug('curve=%s, B1=%s, B2=%s', attempts, B1, B2)
+            d = self.run_curve(N=N, B1=B1, B2=B2)
+            if d is not None:
+                factors = {'p': d, 'q': N // d}
+        elapsed = round(time.time() - start, 6)
+        return {
+            'N': N,
+            'factors': factors,
+            'elapsed_seconds': elapsed,
+            'attempts': attempts
+        }
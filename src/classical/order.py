@@ -0,0 +1,191 @@
+""" Order-finding engines for the classical solver.
+
+The order (period) r of g modulo N is the smallest r > 0 such that
+g^r mod N = 1. This is the piece of Shor's algorithm that the quantum
+computer speeds up; classically we can still do much better than building
+every power g^z for z in range(N).
+
+Each engine is a plain function engine(g, N) -> r so new ones can be
+registered in ORDER_FINDING_ENGINES and selected by name.
+
+vectorized_orders is the batch counterpart: a NumPy kernel that finds the
+orders of a whole vector of bases (and moduli) in one pass, for N small
+enough that products of residues fit in uint64.
+"""
+from math import isqrt
+
+# below this N the incremental engine wins on constant factors
+AUTO_BSGS_THRESHOLD = 1 << 16
+# residues below 2^32 multiply without overflowing uint64, so a plain
+# (a * b) % N is a safe mulmod in the vectorized kernel
+VECTOR_ORDER_LIMIT = 1 << 32
+# entries of the baby-step table built per chunk of bases by the vectorized kernel
+VECTOR_TABLE_SIZE = 1 << 22
+# widest block of giant steps taken per array operation
+VECTOR_BLOCK_SIZE = 1 << 10
+
+
+def incremental_order(g: int = None, N: int = None):
+    """ Find the order of g mod N by repeated modular multiplication,
+    exiting as soon as the running product returns to 1.
+    O(r) time, O(1) memory. Fastest when the order is small. """
+    x = g % N
+    r = 1
+    while x != 1:
+        x = (x * g) % N
+        r += 1
+        if r > N:
+            raise ValueError(f'g={g} is not invertible mod N={N}')
+    return r
+
+
+def baby_step_giant_step_order(g: int = None, N: int = None):
+    """ Find the order of g mod N with Shanks' baby-step/giant-step.
+    Writing r = i*m + j with m = ceil(sqrt(N)) and 0 <= j < m, we store the
+    baby steps g^j in a table and walk giant steps g^(-i*m) until one lands
+    in the table. O(sqrt(N)) time and memory.
+
+    The first giant step that matches gives the smallest r: any earlier
+    match would be a smaller positive exponent with g^r = 1.
+    """
+    m = isqrt(N) + 1
+    table = {}
+    x = 1
+    for j in range(m):
+        if j > 0 and x == 1:
+            # order is smaller than m; found during the baby steps
+            return j
+        table.setdefault(x, j)
+        x = (x * g) % N
+    # giant step factor g^(-m) mod N (raises ValueError if gcd(g, N) != 1)
+    factor = pow(g, -m, N)
+    gamma = 1
+    for i in range(1, m + 1):
+        gamma = (gamma * factor) % N
+        j = table.get(gamma)
+        if j is not None:
+            return i * m + j
+    raise ValueError(f'no order found for g={g} mod N={N}')
+
+
+def auto_order(g: int = None, N: int = None):
+    """ Use incremental multiplication for small N, where the dict
+    overhead of baby-step/giant-step is not worth it, and BSGS otherwise. """
+    if N < AUTO_BSGS_THRESHOLD:
+        return incremental_order(g=g, N=N)
+    return baby_step_giant_step_order(g=g, N=N)
+
+
+def _power_table(bases=None, moduli=None, width: int = 1):
+    """ table[i, j] = bases[i]^j mod moduli[i] for 0 <= j < width, built by
+    doubling: each array operation fills as many columns as are already filled. """
+    import numpy as np
+    table = np.empty((bases.size, width), dtype=np.uint64)
+    table[:, 0] = 1
+    step, filled = bases % moduli, 1  # step = g^filled
+    while filled < width:
+        n = min(filled, width - filled)
+        table[:, filled:filled + n] = table[:, :n] * step[:, None] % moduli[:, None]
+        step = step * step % moduli
+        filled += n
+    return table
+
+
+def vectorized_orders(bases: list = None, N=None):
+    """ Find the order of every base in bases modulo N with NumPy and return
+    them as a list of ints. N may be one modulus or one per base (any N < 2^32,
+    so products of two residues fit in uint64 and (a * b) % N is a safe mulmod),
+    which lets a sweep over many small N share one call.
+
+    This is baby-step/giant-step run for all bases at once: the baby steps
+    g^0 .. g^(m-1) of every base go into one sorted array (row i offset by
+    i * max(N) so rows never collide), and blocks of giant steps g^(-i*m) are
+    looked up in it with one searchsorted per block. Orders below m show up
+    directly in the baby steps. Bases are processed in chunks so the table
+    stays under VECTOR_TABLE_SIZE entries.
+    """
+    import numpy as np
+    bases = np.asarray(bases, dtype=np.uint64).ravel()
+    moduli = np.broadcast_to(np.asarray(N, dtype=np.uint64), bases.shape).copy()
+    if bases.size == 0:
+        return []
+    largest = int(moduli.max())
+    if largest >= VECTOR_ORDER_LIMIT:
+        raise ValueError(f'the vectorized kernel needs N < 2^32, not N={largest}')
+    bases %= moduli
+    not_invertible = np.gcd(bases, moduli) != 1
+    if not_invertible.any():
+        index = int(not_invertible.argmax())
+        raise ValueError(f'g={int(bases[index])} is not invertible mod N={int(moduli[index])}')
+    # a semiprime N = p*q has orders below lambda(N) <= N / 2; larger orders just take more giant steps
+    m = isqrt(largest // 2) + 1
+    chunk = max(1, VECTOR_TABLE_SIZE // m)
+    orders = []
+    for start in range(0, bases.size, chunk):
+        orders.extend(_vectorized_orders_chunk(bases[start:start + chunk], moduli[start:start + chunk], m))
+    return orders
+
+
+def _vectorized_orders_chunk(bases=None, moduli=None, m: int = 1):
+    import numpy as np
+    k = bases.size
+    orders = np.zeros(k, dtype=np.int64)
+    baby = _power_table(bases, moduli, m)
+    # orders below m: the first j > 0 with g^j = 1
+    small = baby[:, 1:] == 1
+    found = small.any(axis=1)
+    orders[found] = small[found].argmax(axis=1) + 1
+    active = np.flatnonzero(~found)
+    if active.size == 0:
+        return orders.tolist()
+    # the order is >= m, so the baby steps of an active base are distinct
+    offset = np.uint64(int(moduli.max()))
+    rows = np.arange(active.size, dtype=np.uint64)[:, None] * offset
+    keys = (baby[active] + rows).ravel()
+    sort = np.argsort(keys)
+    keys = keys[sort]
+    baby_exponent = (sort % m).astype(np.int64)
+    active_moduli = moduli[active]
+    # giant step factor g^(-m), then a block of its powers g^(-m*b) for b = 1..width
+    factor = np.array([pow(int(g), -m, int(n)) for g, n in zip(bases[active], active_moduli)],
+                      dtype=np.uint64)
+    width = min(m, VECTOR_BLOCK_SIZE)
+    block = _power_table(factor, active_moduli, width + 1)[:, 1:]
+    stride = block[:, -1]  # g^(-m*width)
+    x = np.ones(active.size, dtype=np.uint64)  # g^(-m*width*t)
+    remaining = np.arange(active.size)
+    t = 0
+    while remaining.size:
+        gamma = x[:, None] * block % active_moduli[remaining, None] + rows[remaining]
+        position = np.minimum(np.searchsorted(keys, gamma), keys.size - 1)
+        match = keys[position] == gamma
+        hit = match.any(axis=1)
+        if hit.any():
+            column = match[hit].argmax(axis=1)
+            j = baby_exponent[position[hit, column]]
+            orders[active[remaining[hit]]] = (t * width + column + 1) * m + j
+            keep = ~hit
+            remaining, x, block, stride = remaining[keep], x[keep], block[keep], stride[keep]
+        x = x * stride % active_moduli[remaining]
+        t += 1
+    return orders.tolist()
+
+
+ORDER_FINDING_ENGINES = {
+    'incremental': incremental_order,
+    'bsgs': baby_step_giant_step_order,
+    'auto': auto_order,
+}
+
+
+def get_order_finding_engine(engine='auto'):
+    """ Resolve an engine name (or pass through a callable engine(g, N)). """
+    if callable(engine):
+        return engine
+    try:
+        return ORDER_FINDING_ENGINES[engine]
+    except KeyError:
+        raise ValueError(
+            f'unknown order finding engine {engine!r}; '
+            f'choose from {sorted(ORDER_FINDING_ENGINES)}'
+        ) from None
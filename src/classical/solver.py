@@ -1,14 +1,31 @@
 """ Module for factoring semiprime integers using classical / non-quantum / brute force approach. 
 """
 import time 
-from math import sqrt,gcd
+from copy import deepcopy
+from math import sqrt,gcd,isqrt
 from base import Base
-import numpy as np 
-from random import randint 
+from utils.periods import factors_from_period
+from utils.timing import StageTimer
+from utils.store import FactorizationStore
+from utils.guesses import GuessScheduler
+from .order import VECTOR_ORDER_LIMIT, get_order_finding_engine, vectorized_orders
 
 class ClassicalPrimeFactorization(Base):
-    def __init__(self, name: str = 'ClassicalSolver', verbose: bool = False):
+    def __init__(self, name: str = 'ClassicalSolver', verbose: bool = False, order_finder='auto',
+                 timings: bool = False, result_store: FactorizationStore = None, seed: int = None):
+        """ order_finder selects the order-finding engine by name 
+        ('incremental', 'bsgs', 'auto'; see classical/order.py) or 
+        accepts any callable engine(g, N) -> r. 
+        timings=True adds per-stage/per-attempt spans to each result under 'timings'. 
+        result_store (utils/store.py) is consulted before factoring N and before 
+        order finding for each guess, and updated with what was found. 
+        seed seeds the guess scheduler (utils/guesses.py) that picks the bases g. 
+        factor_batch factors many N < 2^32 at once with the vectorized order kernel. """
         super().__init__(name, verbose)
+        self.timer = StageTimer(enabled=timings)
+        self.result_store = result_store
+        self.find_order = get_order_finding_engine(order_finder)
+        self.guesses = GuessScheduler(seed=seed)
 
     # def factor(self, N):
     #     """ Calculate prime factors of N """
@@ -26,6 +43,17 @@ class ClassicalPrimeFactorization(Base):
         """ Classically run shor's algorithm """
         factors_found = False 
         start = time.time()
+        self.timer.reset()
+        if self.result_store is not None:
+            stored = self.result_store.get(N)
+            if stored is not None:
+                return {
+                    'N': N,
+                    'factors': stored['factors'],
+                    'elapsed_seconds': round(time.time() - start, 6),
+                    'attempts': stored['attempts'],
+                    'cached': True
+                }
         if N % 2 == 0: # first simply check if even. 
             end = time.time() 
             elapsed = round(end - start, 6)
@@ -33,42 +61,111 @@ class ClassicalPrimeFactorization(Base):
                     'p': 2, 'q': N // 2
                 }
             factors_found = True 
+        elif isqrt(N) ** 2 == N: # p == q; every even order gives g^(r/2) = -1 
+            end = time.time() 
+            elapsed = round(end - start, 6)
+            factors = {
+                    'p': isqrt(N), 'q': isqrt(N)
+                }
+            factors_found = True 
 
         attempts = 0
+        self.guesses.start(N)
         while not factors_found:
             # Continue until solved. 
             attempts += 1
+            self.timer.start_attempt()
             # Get an initial guess g that is coprime to N (gcd is 1)
-            g = randint(3, N-1)
+            g = self.guesses.next_guess(N)
             while gcd(g, N) != 1:
-                g = randint(3, N-1)
-            self.info(f'attempt={attempts}, g={g}')
+                g = self.guesses.next_guess(N)
+            self.info('attempt=%s, g=%s', attempts, g)
             # Find period r of g^r mod N 
             # (i.e., r is smallest number such that g^r = 1 (mod N))
-            z = list(range(N))
-            y = [g ** z0 % N for z0 in z]
-            r = z[y[1:].index(1)+1] 
-            self.info(f'r={r}->r/2={r/2.}->g**(r/2.)={g**(r/2.)}')
-            if r % 2 == 0: # continue. if odd, can't use r/2 exponent of g. 
-                # x = g^[r/2] (mod N)
-                x = (g ** (r / 2.)) % N
-                if ((x + 1) % N) != 0: # continue. if = 0, guess another g. 
-                    factors = {
-                        'p': gcd(int(x)+1, N),
-                        'q': gcd(int(x)-1, N)
-                    }
-                    end = time.time()
-                    elapsed = round(end - start, 6)
-                    factors_found = True
-        return {
+            r = self.result_store.get_period(g, N) if self.result_store is not None else None
+            if r is None:
+                with self.timer.span('order_finding'):
+                    r = self.find_order(g, N)
+                if self.result_store is not None:
+                    self.result_store.put_period(g, N, r)
+            self.info('r=%s', r)
+            # continue if r is even and g^(r/2) != -1 (mod N); otherwise guess another g.
+            with self.timer.span('postprocess'):
+                factors = factors_from_period(g=g, r=r, N=N)
+            if factors is not None:
+                end = time.time()
+                elapsed = round(end - start, 6)
+                factors_found = True
+            else:
+                self.guesses.record_failure(g, N, period=r)
+        result = {
             'N': N, 
             'factors': factors, 
-            'elapsed_seconds': elapsed
+            'elapsed_seconds': elapsed,
+            'attempts': attempts
         }
-         
-
-            
+        if self.timer.enabled:
+            result['timings'] = self.timer.report()
+        if self.result_store is not None:
+            self.result_store.put(result)
+        return result
 
+    def factor_batch(self, numbers: list = None, bases_per_number: int = 1):
+        """ Factor many N together: each round draws bases_per_number bases for every
+        N not yet split and finds all their orders in a single vectorized_orders call
+        over the mixed moduli, so a sweep over thousands of small N takes a handful of
+        array passes instead of thousands of order findings. Returns one result dict per
+        entry of numbers, as factor() would; 'attempts' counts the rounds an N took.
+        Even N, squares, stored results and N >= 2^32 go through factor() and keep its
+        per-N timings; the vectorized rounds are shared by every N, so their results
+        carry no 'timings' and self.timer.report() covers the rounds as a whole. """
+        start = time.time()
+        results = {}
+        attempts = {}
+        for N in dict.fromkeys(numbers):
+            stored = self.result_store.get(N) if self.result_store is not None else None
+            if stored is not None or N % 2 == 0 or isqrt(N) ** 2 == N or N >= VECTOR_ORDER_LIMIT:
+                results[N] = self.factor(N)
+            else:
+                attempts[N] = 0
+                self.guesses.start(N)
+        self.timer.reset()
 
+        def solved(N: int = None, factors: dict = None):
+            results[N] = {
+                'N': N,
+                'factors': factors,
+                'elapsed_seconds': round(time.time() - start, 6),
+                'attempts': attempts.pop(N)
+            }
+            if self.result_store is not None:
+                self.result_store.put(results[N])
 
-        
\ No newline at end of file
+        while attempts:
+            self.timer.start_attempt()
+            bases, moduli = [], []
+            for N in list(attempts):
+                attempts[N] += 1
+                for _ in range(min(bases_per_number, N - 3)):
+                    g = self.guesses.next_guess(N)
+                    _gcd = gcd(g, N)
+                    if _gcd != 1:
+                        # a base sharing a factor with N has already split it
+                        solved(N, {'p': _gcd, 'q': N // _gcd})
+                        break
+                    bases.append(g)
+                    moduli.append(N)
+            self.info('round of %s bases over %s moduli', len(bases), len(set(moduli)))
+            with self.timer.span('order_finding'):
+                orders = vectorized_orders(bases, moduli)
+            with self.timer.span('postprocess'):
+                for g, N, r in zip(bases, moduli, orders):
+                    if N in results:
+                        continue
+                    factors = factors_from_period(g=g, r=r, N=N)
+                    if factors is None:
+                        self.guesses.record_failure(g, N, period=r)
+                        continue
+                    solved(N, factors)
+        # deep copies, so repeated N do not share one dict (or its 'factors')
+        return [deepcopy(results[N]) for N in numbers]
@@ -0,0 +1,138 @@
+""" Streaming command line front end for the factoring solvers.
+
+`factor` reads N values lazily (one per line) from a file or stdin, factors
+them with the chosen solver and writes one JSON result per line to stdout
+as each one finishes. With --workers the work is spread over a process
+pool with at most --max-in-flight chunks outstanding, so memory stays flat
+however long the input is. Results carry an 'index' (the input line
+number among the N values) because with workers they arrive out of order.
+
+`plot` is the offline step: it reads that JSONL output and draws the
+N vs. seconds plot that Driver.run_implementation makes.
+
+    python cli.py factor moduli.txt --solver dispatcher --workers 8 > results.jsonl
+    seq 15 2 9999 | python cli.py factor --solver classical
+    python cli.py plot results.jsonl --fname dispatcher.png
+"""
+import argparse
+import json
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from registry import SOLVER_NAMES, solver_spec
+from utils.batch import init_worker, factor_chunk, factor_with_timeout, worker_initargs
+
+
+def read_numbers(stream=None):
+    """ Lazily yield the integers in stream, one per non-blank line ('#' starts a comment). """
+    for line in stream:
+        line = line.split('#', 1)[0].strip()
+        if line:
+            yield int(line)
+
+
+def iter_chunks(numbers=None, chunksize: int = 1):
+    """ Lazily group numbers into lists of (index, N) pairs of at most chunksize. """
+    indexed = enumerate(numbers)
+    while True:
+        chunk = list(islice(indexed, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_factor_stream(solver_cls: type = None, solver_kwargs: dict = None, numbers=None,
+                       max_workers: int = 0, max_in_flight: int = None, chunksize: int = 1,
+                       timeout: float = None):
+    """ Factor an iterable of N, yielding (index, result) pairs as they finish.
+    Without workers everything runs in this process in input order. With workers,
+    at most max_in_flight chunks (default 2 per worker) are submitted at any time
+    and the next chunk is only read from the input once one completes. """
+    if not max_workers:
+        solver = solver_cls(**(solver_kwargs or {}))
+        for index, N in enumerate(numbers):
+            yield index, factor_with_timeout(solver=solver, N=N, timeout=timeout)
+        return
+    max_in_flight = max_in_flight or 2 * max_workers
+    chunks = iter_chunks(numbers, chunksize)
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=init_worker,
+        initargs=worker_initargs(solver_cls, solver_kwargs),
+    ) as executor:
+        in_flight = set()
+        for chunk in islice(chunks, max_in_flight):
+            in_flight.add(executor.submit(factor_chunk, chunk, timeout))
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for chunk in islice(chunks, len(done)):
+                in_flight.add(executor.submit(factor_chunk, chunk, timeout))
+            for future in done:
+                yield from future.result()
+
+
+def factor_command(args):
+    solver_cls, solver_kwargs = solver_spec(args.solver, verbose=args.verbose, seed=args.seed)
+    source = sys.stdin if args.input in (None, '-') else open(args.input)
+    try:
+        for index, result in iter_factor_stream(
+            solver_cls=solver_cls,
+            solver_kwargs=solver_kwargs,
+            numbers=read_numbers(source),
+            max_workers=args.workers,
+            max_in_flight=args.max_in_flight,
+            chunksize=args.chunksize,
+            timeout=args.timeout,
+        ):
+            sys.stdout.write(json.dumps({'index': index, 'solver': args.solver, **result}) + '\n')
+            sys.stdout.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    return 0
+
+
+def plot_command(args):
+    # plotting (and matplotlib) stays out of the factoring path entirely
+    from main import Driver
+    x, y = [], []
+    with open(args.results) as f:
+        for line in f:
+            if line.strip():
+                result = json.loads(line)
+                if result.get('factors'):
+                    x.append(result['N'])
+                    y.append(result['elapsed_seconds'])
+    Driver().plot_results(x=x, y=y, title=args.title, fname=args.fname)
+    return 0
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description='Factor semiprimes as a JSONL stream.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    factor = commands.add_parser('factor', help='factor N values read one per line')
+    factor.add_argument('input', nargs='?', help='file with one N per line (default: stdin)')
+    factor.add_argument('--solver', default='classical', choices=SOLVER_NAMES)
+    factor.add_argument('--workers', type=int, default=0,
+                        help='worker processes (0 factors in this process)')
+    factor.add_argument('--max-in-flight', type=int, default=None,
+                        help='chunks submitted but not finished (default 2 per worker)')
+    factor.add_argument('--chunksize', type=int, default=16)
+    factor.add_argument('--timeout', type=float, default=None, help='per-N limit in seconds')
+    factor.add_argument('--seed', type=int, default=None)
+    factor.add_argument('--verbose', action='store_true')
+    factor.set_defaults(run=factor_command)
+
+    plot = commands.add_parser('plot', help='plot N vs. seconds from factor output')
+    plot.add_argument('results', help='JSONL written by the factor command')
+    plot.add_argument('--fname', default='results.png', help='file name inside plots/')
+    plot.add_argument('--title', default='Time Required to Factor Semiprime into Primes')
+    plot.set_defaults(run=plot_command)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
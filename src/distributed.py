@@ -0,0 +1,444 @@
+""" Coordinator / worker mode for semiprime sweeps larger than one host.
+
+A Coordinator owns the corpus. It splits the semiprimes into chunks and
+serves them over TCP from a multiprocessing manager process started by
+serve_coordinator (stopped with manager.shutdown()). Workers connect, lease
+a chunk, factor it with any solver from registry.py and report every result
+as soon as it is ready. The coordinator appends each result to a JSONL
+checkpoint, so a restarted coordinator skips what is already done.
+
+A lease lasts lease_seconds and is renewed by the worker's heartbeat thread
+and by every report. When a worker crashes or is killed its heartbeats stop,
+the lease expires, and the unreported rest of its chunk goes back to the
+queue for another worker. Heartbeats only renew a lease for timeout +
+lease_seconds after the worker's last report, so a worker stuck on one N
+(e.g. in native code the per-N timeout cannot interrupt) loses its chunk too.
+
+    # on the coordinator host
+    export DISTRIBUTED_AUTHKEY=$(python -c 'import secrets; print(secrets.token_hex(16))')
+    python distributed.py coordinator moduli.txt --host 0.0.0.0 --port 50000 \\
+        --solver dispatcher --checkpoint sweep.jsonl
+    # on every worker host (or several times on one box), with the same DISTRIBUTED_AUTHKEY
+    python distributed.py worker --address coordinator-host:50000
+
+The manager protocol uses pickle, so anyone who knows the authkey can run code
+in the coordinator and workers. Only run it on trusted networks and set
+--authkey (or DISTRIBUTED_AUTHKEY) to a shared secret: serving on anything but
+a loopback address with the public default key is refused. The default host
+is 127.0.0.1. Driver.factor_distributed runs a coordinator plus local worker
+processes on one machine.
+"""
+import argparse
+import ipaddress
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from multiprocessing.managers import BaseManager
+from base import Base
+from registry import SOLVER_NAMES, build_solver
+from utils.batch import factor_with_timeout, worker_seed
+
+# the well-known fallback key only protects coordinators bound to a loopback address
+PUBLIC_AUTHKEY = b'semiprimes'
+DEFAULT_AUTHKEY = os.environ.get('DISTRIBUTED_AUTHKEY', PUBLIC_AUTHKEY.decode()).encode()
+# per-N limit in seconds when none is given; it also bounds how long a lease is renewed without a report
+DEFAULT_TIMEOUT = 600.0
+# the methods of a Coordinator that workers may call through the manager
+COORDINATOR_METHODS = ('register', 'lease', 'heartbeat', 'report')
+# ... and those its owner (serve_coordinator's caller) uses
+OWNER_METHODS = ('wait', 'progress', 'ordered_results', 'log_progress', 'close')
+
+# the Coordinator served by this process, when it is a coordinator manager process
+_served = None
+
+
+def _init_served(options: dict = None):
+    global _served
+    _served = Coordinator(**options)
+
+
+def _get_served():
+    return _served
+
+
+class CoordinatorManager(BaseManager):
+    """ Manager exposing a coordinator as 'coordinator': serve_coordinator starts one 
+    in its own process, workers connect() to it. """
+
+
+CoordinatorManager.register('coordinator', callable=_get_served, exposed=COORDINATOR_METHODS + OWNER_METHODS)
+
+
+def is_loopback(host: str = None):
+    """ Whether host names or resolves to a loopback address ('' and 0.0.0.0 do not). """
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        pass
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, UnicodeError, ValueError):
+        return False
+
+
+def check_authkey(host: str = None, authkey: bytes = None):
+    """ Refuse to serve on a non-loopback host with the public default authkey. """
+    if authkey == PUBLIC_AUTHKEY and not is_loopback(host):
+        raise ValueError(f'refusing to serve on {host!r} with the public default authkey; '
+                         'set --authkey or DISTRIBUTED_AUTHKEY to a shared secret')
+
+
+def read_checkpoint(path: str = None):
+    """ {index: result} for every complete line of a JSONL checkpoint. A line cut
+    short by a crash is skipped, so its index is simply factored again. """
+    done = {}
+    if path is None or not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[result['index']] = result
+    return done
+
+
+class Coordinator(Base):
+    def __init__(self, name: str = 'Coordinator', verbose: bool = False, numbers: list = None,
+                 solver: str = 'classical', solver_options: dict = None, seed: int = None,
+                 chunksize: int = 16, lease_seconds: float = 30.0, timeout: float = DEFAULT_TIMEOUT,
+                 checkpoint: str = None):
+        """ numbers is the corpus; results are keyed by position in it. Workers build
+        build_solver(solver, seed=worker_seed(seed, worker id), **solver_options) and apply a per-N timeout 
+        (None or 0: no limit, and heartbeats then renew a lease indefinitely).
+        A chunk of chunksize semiprimes is leased for lease_seconds at a time.
+        checkpoint is a JSONL path: results already in it are not handed out again,
+        and new results are appended to it as they arrive. """
+        super().__init__(name, verbose)
+        if solver not in SOLVER_NAMES:
+            raise ValueError(f'unknown solver {solver!r}; choose from {SOLVER_NAMES}')
+        self.numbers = list(numbers or [])
+        self.config = {
+            'solver': solver,
+            'solver_options': solver_options or {},
+            'seed': seed,
+            'timeout': timeout,
+            'lease_seconds': lease_seconds,
+        }
+        self.lease_seconds = lease_seconds
+        # how long heartbeats keep a lease alive after the holder's last report
+        self.report_seconds = timeout + lease_seconds if timeout else None
+        self.checkpoint = checkpoint
+        self.results = {
+            index: result for index, result in read_checkpoint(checkpoint).items()
+            if index < len(self.numbers) and result.get('N') == self.numbers[index]
+        }
+        todo = [index for index in range(len(self.numbers)) if index not in self.results]
+        # chunk id -> {index: N} of the semiprimes in it that are not done yet
+        self.chunks = {
+            chunk_id: {index: self.numbers[index] for index in todo[start:start + chunksize]}
+            for chunk_id, start in enumerate(range(0, len(todo), chunksize))
+        }
+        self.queue = deque(self.chunks)
+        self.leases = {}  # chunk id -> (worker id, deadline, renewal deadline)
+        self.workers = {}  # worker id -> worker name
+        self.reassigned = 0
+        self._lock = threading.Lock()
+        self._checkpoint_file = open(checkpoint, 'a+') if checkpoint else None
+        if self._checkpoint_file is not None and self._checkpoint_file.tell() > 0:
+            # end a line cut short by a crash so the next result starts on its own line
+            self._checkpoint_file.seek(self._checkpoint_file.tell() - 1)
+            if self._checkpoint_file.read(1) != '\n':
+                self._checkpoint_file.write('\n')
+        self.finished = threading.Event()
+        if not self.chunks:
+            self.finished.set()
+        self.info('%s semiprimes, %s already done, %s chunks to hand out',
+                  len(self.numbers), len(self.results), len(self.chunks))
+
+    def register(self, worker_name: str = ''):
+        """ Called once by each worker: returns its worker id and the solver settings. """
+        with self._lock:
+            worker_id = len(self.workers)
+            self.workers[worker_id] = worker_name
+        self.info('worker %s registered as %s', worker_name, worker_id)
+        return {'worker_id': worker_id, **self.config}
+
+    def _grant(self, chunk_id: int = None, worker_id: int = None):
+        """ Lease chunk_id to worker_id afresh, as on a lease or a report. """
+        now = time.monotonic()
+        renewal_deadline = now + self.report_seconds if self.report_seconds else None
+        self.leases[chunk_id] = (worker_id, now + self.lease_seconds, renewal_deadline)
+
+    def _expire_leases(self):
+        now = time.monotonic()
+        for chunk_id, (worker_id, deadline, _) in list(self.leases.items()):
+            if deadline < now:
+                del self.leases[chunk_id]
+                self.queue.append(chunk_id)
+                self.reassigned += 1
+                self.info('lease of chunk %s expired on worker %s; %s semiprimes go back to the queue',
+                          chunk_id, worker_id, len(self.chunks[chunk_id]))
+
+    def lease(self, worker_id: int = None):
+        """ Next chunk for a worker as {'chunk_id', 'items': [(index, N), ...]};
+        {'wait': seconds} while every remaining chunk is leased to someone else,
+        or {'done': True} once the corpus is finished. """
+        with self._lock:
+            self._expire_leases()
+            if self.queue:
+                chunk_id = self.queue.popleft()
+                self._grant(chunk_id, worker_id)
+                self.debug('chunk %s leased to worker %s', chunk_id, worker_id)
+                return {'chunk_id': chunk_id, 'items': sorted(self.chunks[chunk_id].items())}
+            if self.leases:
+                return {'wait': min(1.0, self.lease_seconds / 4)}
+            return {'done': True}
+
+    def heartbeat(self, worker_id: int = None):
+        """ Renew every lease held by worker_id, but not past its renewal deadline
+        (timeout + lease_seconds after the last report); returns how many were renewed. """
+        with self._lock:
+            now = time.monotonic()
+            renewed = 0
+            for chunk_id, (holder, deadline, renewal_deadline) in list(self.leases.items()):
+                if holder != worker_id:
+                    continue
+                deadline = now + self.lease_seconds
+                if renewal_deadline is not None:
+                    if renewal_deadline <= now:
+                        continue
+                    deadline = min(deadline, renewal_deadline)
+                self.leases[chunk_id] = (worker_id, deadline, renewal_deadline)
+                renewed += 1
+            return renewed
+
+    def report(self, worker_id: int = None, chunk_id: int = None, index: int = None, result: dict = None):
+        """ Record one result and renew the lease. Returns whether the worker should
+        go on with the chunk: False once it is finished, or when the lease expired and
+        the chunk was handed out again. A result for an index that is already done
+        is ignored. """
+        with self._lock:
+            chunk = self.chunks.get(chunk_id)
+            if chunk is not None and index in chunk:
+                del chunk[index]
+                record = {'index': index, 'solver': self.config['solver'],
+                          'worker': self.workers.get(worker_id), **result}
+                self.results[index] = record
+                if self._checkpoint_file is not None:
+                    self._checkpoint_file.write(json.dumps(record) + '\n')
+                    self._checkpoint_file.flush()
+                if not chunk:
+                    del self.chunks[chunk_id]
+                    self.leases.pop(chunk_id, None)
+                    if chunk_id in self.queue:
+                        self.queue.remove(chunk_id)
+                    if not self.chunks:
+                        self.finished.set()
+            holder, *_ = self.leases.get(chunk_id, (None,))
+            if holder != worker_id:
+                return False
+            self._grant(chunk_id, worker_id)
+            return True
+
+    def wait(self, timeout: float = None):
+        """ Block until every semiprime has a result (or timeout seconds pass);
+        returns whether the corpus is finished. """
+        return self.finished.wait(timeout)
+
+    def close(self):
+        """ Close the checkpoint. """
+        if self._checkpoint_file is not None:
+            self._checkpoint_file.close()
+            self._checkpoint_file = None
+
+    def ordered_results(self):
+        """ Results in corpus order (None for semiprimes not done yet). """
+        return [self.results.get(index) for index in range(len(self.numbers))]
+
+    def progress(self):
+        """ Progress counters: done, remaining, leased chunks, reassigned leases, workers. """
+        with self._lock:
+            return {
+                'done': len(self.results),
+                'remaining': len(self.numbers) - len(self.results),
+                'leased_chunks': len(self.leases),
+                'reassigned': self.reassigned,
+                'workers': len(self.workers),
+            }
+
+    def log_progress(self, message: str = 'progress'):
+        """ Log the progress counters from the coordinator's own process. """
+        self.info('%s: %s', message, self.progress())
+
+
+def serve_coordinator(host: str = '127.0.0.1', port: int = 0, authkey: bytes = DEFAULT_AUTHKEY,
+                      **options):
+    """ Start a CoordinatorManager process serving Coordinator(**options) on (host, port)
+    and return (manager, coordinator proxy); manager.address is the bound address 
+    (port=0 picks a free port). The proxy offers the Coordinator's worker methods plus 
+    wait, progress, ordered_results, log_progress and close. Call close() on it and then 
+    manager.shutdown() when done. Raises ValueError for a non-loopback host with the 
+    public default authkey (see check_authkey) or an unknown solver. """
+    check_authkey(host, authkey)
+    solver = options.get('solver', 'classical')
+    if solver not in SOLVER_NAMES:
+        raise ValueError(f'unknown solver {solver!r}; choose from {SOLVER_NAMES}')
+    manager = CoordinatorManager(address=(host, port), authkey=authkey)
+    manager.start(initializer=_init_served, initargs=(options,))
+    coordinator = manager.coordinator()
+    coordinator.log_progress(f'serving on {manager.address[0]}:{manager.address[1]}')
+    return manager, coordinator
+
+
+class Worker(Base):
+    def __init__(self, name: str = None, verbose: bool = False, address: tuple = ('127.0.0.1', 50000),
+                 authkey: bytes = DEFAULT_AUTHKEY, connect_timeout: float = 30.0):
+        """ A worker that factors chunks leased from the coordinator at address.
+        It keeps retrying the connection for connect_timeout seconds, so workers
+        may be started before the coordinator. """
+        # one logger (and log file) for every worker process; the pid goes in each line instead
+        super().__init__(name or 'Worker', verbose)
+        self.prefix = f'{self.name}-{os.getpid()}'
+        self.address = tuple(address)
+        self.authkey = authkey
+        self.connect_timeout = connect_timeout
+
+    def connect(self):
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            manager = CoordinatorManager(address=self.address, authkey=self.authkey)
+            try:
+                manager.connect()
+                return manager.coordinator()
+            except ConnectionRefusedError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.5)
+
+    def _heartbeat(self, coordinator=None, worker_id: int = None, interval: float = None,
+                   stop: threading.Event = None):
+        # this thread gets its own manager connection, so it can renew the lease
+        # while the main thread is busy in solver.factor
+        while not stop.wait(interval):
+            try:
+                coordinator.heartbeat(worker_id)
+            except (EOFError, OSError):
+                return
+
+    def run(self):
+        """ Lease and factor chunks until the coordinator reports the corpus done
+        (or goes away). Returns the number of results this worker reported. """
+        coordinator = self.connect()
+        config = coordinator.register(self.prefix)
+        worker_id = config['worker_id']
+        solver = build_solver(config['solver'], verbose=self.verbose,
+                              seed=worker_seed(config['seed'], worker_id), **config['solver_options'])
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(coordinator, worker_id, config['lease_seconds'] / 3, stop),
+            name=f'{self.prefix}-heartbeat', daemon=True)
+        heartbeat.start()
+        reported = 0
+        try:
+            while True:
+                lease = coordinator.lease(worker_id)
+                if lease.get('done'):
+                    break
+                if 'wait' in lease:
+                    time.sleep(lease['wait'])
+                    continue
+                self.info('worker %s: chunk %s with %s semiprimes', worker_id, lease['chunk_id'], len(lease['items']))
+                for index, N in lease['items']:
+                    result = factor_with_timeout(solver=solver, N=N, timeout=config['timeout'])
+                    reported += 1
+                    if not coordinator.report(worker_id, lease['chunk_id'], index, result):
+                        break
+        except (EOFError, OSError) as e:
+            self.error('lost the coordinator: %s', e)
+        finally:
+            stop.set()
+        return reported
+
+
+def run_worker(address: tuple = None, authkey: bytes = DEFAULT_AUTHKEY, verbose: bool = False):
+    """ Process target for local workers (see Driver.factor_distributed). """
+    return Worker(verbose=verbose, address=address, authkey=authkey).run()
+
+
+def parse_address(address: str = None):
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def coordinator_command(args):
+    from cli import read_numbers
+    with (sys.stdin if args.input in (None, '-') else open(args.input)) as source:
+        numbers = list(read_numbers(source))
+    manager, coordinator = serve_coordinator(
+        host=args.host, port=args.port, authkey=args.authkey.encode(),
+        verbose=args.verbose, numbers=numbers, solver=args.solver, seed=args.seed,
+        chunksize=args.chunksize, lease_seconds=args.lease_seconds, timeout=args.timeout,
+        checkpoint=args.checkpoint)
+    try:
+        while not coordinator.wait(timeout=args.progress_interval):
+            coordinator.log_progress()
+        coordinator.log_progress('finished')
+    finally:
+        coordinator.close()
+        manager.shutdown()
+    return 0
+
+
+def worker_command(args):
+    worker = Worker(verbose=args.verbose, address=parse_address(args.address),
+                    authkey=args.authkey.encode(), connect_timeout=args.connect_timeout)
+    worker.run()
+    return 0
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description='Factor a semiprime corpus over TCP workers.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    authkey = DEFAULT_AUTHKEY.decode()
+
+    coordinator = commands.add_parser('coordinator', help='serve a corpus to workers')
+    coordinator.add_argument('input', nargs='?', help='file with one N per line (default: stdin)')
+    coordinator.add_argument('--host', default='127.0.0.1')
+    coordinator.add_argument('--port', type=int, default=50000)
+    coordinator.add_argument('--authkey', default=authkey)
+    coordinator.add_argument('--solver', default='classical', choices=SOLVER_NAMES)
+    coordinator.add_argument('--seed', type=int, default=None)
+    coordinator.add_argument('--chunksize', type=int, default=16)
+    coordinator.add_argument('--lease-seconds', type=float, default=30.0)
+    coordinator.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                             help='per-N limit in seconds (0: none)')
+    coordinator.add_argument('--checkpoint', default='results.jsonl',
+                             help='JSONL file results are appended to (and resumed from)')
+    coordinator.add_argument('--progress-interval', type=float, default=10.0)
+    coordinator.add_argument('--verbose', action='store_true')
+    coordinator.set_defaults(run=coordinator_command)
+
+    worker = commands.add_parser('worker', help='factor chunks leased from a coordinator')
+    worker.add_argument('--address', default='127.0.0.1:50000', help='coordinator host:port')
+    worker.add_argument('--authkey', default=authkey)
+    worker.add_argument('--connect-timeout', type=float, default=30.0)
+    worker.add_argument('--verbose', action='store_true')
+    worker.set_defaults(run=worker_command)
+
+    args = parser.parse_args(argv)
+    if args.command == 'coordinator':
+        try:
+            check_authkey(args.host, args.authkey.encode())
+        except ValueError as e:
+            parser.error(str(e))
+    return args.run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
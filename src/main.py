@@ -1,20 +1,33 @@
-from utils.semiprimes import SemiPrimeGenerator
-from classical.solver import ClassicalPrimeFactorization
-import matplotlib.pyplot as plt 
-import numpy as np
+""" Driver for running the solvers over lists of semiprimes.
+
+matplotlib, NumPy and the Qiskit solver are imported inside the methods that
+use them, so importing this module (e.g. in every pool worker or short CLI
+call) stays cheap; solvers are built through registry.solver_spec. """
 import os 
+import inspect
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from base import Base
-from qskt.solver import QiskitShor
+from utils.batch import init_worker, factor_chunk, chunked, worker_initargs
+from utils.timing import profiled
+from utils.store import FactorizationStore
+from registry import solver_spec
 
 class Driver(Base):
-    def __init__(self, name: str = 'Driver', verbose: bool = False):
+    def __init__(self, name: str = 'Driver', verbose: bool = False,
+                 result_store: FactorizationStore = None):
+        """ result_store (utils/store.py) is consulted before handing a semiprime 
+        to any solver; repeated N are answered from it without factoring. """
         super().__init__(name, verbose)
+        self.result_store = result_store
         self.plots_dir = os.path.join(os.getcwd(), 'plots')
         os.makedirs(self.plots_dir, exist_ok=True)
 
     def plot_results(self, x: list = [], y: list = [], title: str = '', fname: str = ''):
         """ Plot provided results as line graph with N on X axis and time 
         required for factoring on Y (seconds)"""
+        import matplotlib.pyplot as plt 
+        import numpy as np
         ax = plt.gca()
         ax.get_xaxis().get_major_formatter().set_useOffset(False)
         x,y = np.array(x), np.array(y)
@@ -27,19 +40,187 @@ class Driver(Base):
         plt.tight_layout()
         plt.savefig(os.path.join(self.plots_dir, fname))
 
+    def log_result(self, solver_name: str = '', i: int = 0, result: dict = None):
+        """ Log one factoring result in the same format for serial and batch runs """
+        p, q = (result['factors'] or {}).get('p'), (result['factors'] or {}).get('q')
+        self.info('solver=%s, i=%s, N=%s => p=%s,q=%s, sec=%s', solver_name, i, result['N'], p, q, result['elapsed_seconds'])
+
+    def iter_factor_many(self, 
+        solver_cls: type = None, 
+        semiprimes: list = [], 
+        solver_kwargs: dict = None,
+        max_workers: int = None, 
+        chunksize: int = None, 
+        timeout: float = None,
+        ordered: bool = True,
+    ):
+        """ Factor semiprimes across a ProcessPoolExecutor, yielding (i, result) pairs.
+        Each worker builds one solver_cls(**solver_kwargs) up front (so solver and Qiskit
+        imports happen once per worker) and then factors chunks of `chunksize` semiprimes.
+        `timeout` is a per-item limit in seconds; items that exceed it come back with 
+        factors=None and timed_out=True. With ordered=True results are yielded in input 
+        order, otherwise as soon as their chunk completes. """
+        max_workers = max_workers or os.cpu_count()
+        if chunksize is None:
+            # a few chunks per worker balances load without much IPC overhead
+            chunksize = max(1, -(-len(semiprimes) // (max_workers * 4)))
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=init_worker,
+            initargs=worker_initargs(solver_cls, solver_kwargs),
+        ) as executor:
+            futures = [
+                executor.submit(factor_chunk, chunk, timeout) 
+                for chunk in chunked(semiprimes, chunksize)
+            ]
+            pending, next_index = {}, 0
+            for future in as_completed(futures):
+                for i, result in future.result():
+                    if not ordered:
+                        yield i, result
+                        continue
+                    pending[i] = result
+                    while next_index in pending:
+                        yield next_index, pending.pop(next_index)
+                        next_index += 1
+
+    def factor_many(self, 
+        solver_cls: type = None, 
+        semiprimes: list = [], 
+        solver_kwargs: dict = None,
+        max_workers: int = None, 
+        chunksize: int = None, 
+        timeout: float = None,
+        ordered: bool = True,
+    ):
+        """ Batch version of solver.factor over a process pool (see iter_factor_many).
+        Returns the list of result dicts, logging each one like run_implementation does. """
+        solver_kwargs = solver_kwargs or {}
+        solver_name = solver_kwargs.get(
+            'name', inspect.signature(solver_cls).parameters['name'].default)
+        results = []
+        for i, result in self.iter_factor_many(
+            solver_cls=solver_cls,
+            semiprimes=semiprimes,
+            solver_kwargs=solver_kwargs,
+            max_workers=max_workers,
+            chunksize=chunksize,
+            timeout=timeout,
+            ordered=ordered,
+        ):
+            self.log_result(solver_name=solver_name, i=i, result=result)
+            results.append(result)
+        return results
+
+    def factor_threaded(self, 
+        solver_factory=None, 
+        semiprimes: list = [], 
+        max_concurrent: int = 8,
+    ):
+        """ Factor semiprimes on up to max_concurrent threads of this process, each 
+        thread using its own solver built by solver_factory(). Meant for Qiskit solvers 
+        sharing one CircuitBatcher, so the QPE circuits of different N end up in the 
+        same Aer jobs. Returns the results in input order. """
+        local = threading.local()
+
+        def factor(i: int = None, N: int = None):
+            if not hasattr(local, 'solver'):
+                local.solver = solver_factory()
+            return i, local.solver.name, local.solver.factor(N)
+
+        results = [None] * len(semiprimes)
+        with ThreadPoolExecutor(max_workers=max_concurrent) as executor:
+            futures = [executor.submit(factor, i, N) for i, N in enumerate(semiprimes)]
+            for future in as_completed(futures):
+                i, solver_name, result = future.result()
+                self.log_result(solver_name=solver_name, i=i, result=result)
+                results[i] = result
+        return results
+
+    def factor_distributed(self, 
+        solver: str = 'classical', 
+        semiprimes: list = [], 
+        local_workers: int = None,
+        solver_options: dict = None,
+        seed: int = None,
+        chunksize: int = 16,
+        lease_seconds: float = 30.0,
+        timeout: float = None,
+        checkpoint: str = None,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        authkey: bytes = None,
+    ):
+        """ Factor semiprimes through a Coordinator (distributed.py) that leases chunks 
+        over TCP on host:port to local_workers worker processes on this machine 
+        (default: one per core) and to any remote workers started with 
+        `python distributed.py worker --address <host:port>`. solver is a registry 
+        name. Chunks of crashed workers are reassigned, and checkpoint (JSONL) lets a 
+        rerun skip semiprimes that were already done. timeout is the per-N limit in 
+        seconds (default distributed.DEFAULT_TIMEOUT, 0 for none). Returns the results 
+        in input order, logging each one like factor_many. """
+        import multiprocessing
+        from distributed import DEFAULT_AUTHKEY, DEFAULT_TIMEOUT, run_worker, serve_coordinator
+        authkey = authkey or DEFAULT_AUTHKEY
+        local_workers = os.cpu_count() if local_workers is None else local_workers
+        manager, coordinator = serve_coordinator(
+            host=host, port=port, authkey=authkey,
+            verbose=self.verbose, numbers=semiprimes, solver=solver, solver_options=solver_options,
+            seed=seed, chunksize=chunksize, lease_seconds=lease_seconds,
+            timeout=DEFAULT_TIMEOUT if timeout is None else timeout, checkpoint=checkpoint)
+        address = manager.address
+        workers = [
+            multiprocessing.Process(target=run_worker, args=(address, authkey, self.verbose), daemon=True)
+            for _ in range(local_workers)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            while not coordinator.wait(timeout=1.0):
+                progress = coordinator.progress()
+                if workers and not any(worker.is_alive() for worker in workers) \
+                        and progress['workers'] <= len(workers):
+                    raise RuntimeError(f'every local worker exited before the sweep finished: {progress}')
+            results = coordinator.ordered_results()
+        finally:
+            # workers release their manager proxies on exit, so stop serving only after they are gone
+            for worker in workers:
+                worker.join(timeout=5)
+                if worker.is_alive():
+                    worker.terminate()
+            coordinator.close()
+            manager.shutdown()
+        for i, result in enumerate(results):
+            self.log_result(solver_name=solver, i=i, result=result)
+        return results
+
     def run_implementation(self, 
         solver: Base = None,
         semiprimes: list = [],
         plot_results: bool = True, 
+        max_workers: int = None,
+        timeout: float = None,
+        profile: bool = False,
+        spec: tuple = None,
     ):
+        """ Factor each semiprime with solver and optionally plot the timings.
+        spec is the (solver class, constructor kwargs) pair from registry.solver_spec; 
+        solver defaults to the solver it builds. When max_workers is given the semiprimes 
+        are spread over a process pool via factor_many, with each worker building its 
+        own solver from spec, so spec is required then (a ValueError is raised without it). 
+        profile=True runs the whole batch under cProfile and dumps the stats to 
+        src/log/<solver name>-<timestamp>.prof (only the parent process is profiled). """
+        if solver is None:
+            solver_cls, solver_kwargs = spec
+            solver = solver_cls(**solver_kwargs)
+        with profiled(name=solver.name.replace(' ', ''), enabled=profile):
+            results = self._run_solver(solver=solver, semiprimes=semiprimes,
+                                       max_workers=max_workers, timeout=timeout, spec=spec)
         x = []
         y = []
-        for i,sp in enumerate(semiprimes):
-            result = solver.factor(sp)
-            p,q,elapsed = result['factors']['p'], result['factors']['q'],result['elapsed_seconds']
-            self.info(f'solver={solver.name}, i={i}, N={sp} => p={p},q={q}, sec={elapsed}')
-            x.append(sp)
-            y.append(elapsed)
+        for result in results:
+            x.append(result['N'])
+            y.append(result['elapsed_seconds'])
         if plot_results:
             self.plot_results(
                 x=x, 
@@ -47,31 +228,125 @@ class Driver(Base):
                 title=f'Time Required to Factor Semiprime into Primes (solver={solver.name})',
                 fname=f'{solver.name.lower().replace(" ", "")}.png'
             )
+        return results
+
+    def stored_result(self, N: int = None):
+        """ Result dict for N from the result store, or None on a miss (or without a store). """
+        if self.result_store is None:
+            return None
+        stored = self.result_store.get(N)
+        if stored is None:
+            return None
+        return {'N': N, 'factors': stored['factors'], 'elapsed_seconds': 0.0,
+                'attempts': stored['attempts'], 'cached': True}
+
+    def _run_solver(self, solver: Base = None, semiprimes: list = [],
+                    max_workers: int = None, timeout: float = None, spec: tuple = None):
+        if max_workers and spec is None:
+            # rebuilding the solver from its name alone would silently drop its options
+            raise ValueError(f'max_workers needs the registry spec solver {solver.name!r} was built from '
+                             '(run_implementation(spec=registry.solver_spec(...)))')
+        results = [self.stored_result(sp) for sp in semiprimes]
+        for i, result in enumerate(results):
+            if result is not None:
+                self.log_result(solver_name=solver.name, i=i, result=result)
+        todo = [i for i, result in enumerate(results) if result is None]
+        if max_workers:
+            solver_cls, solver_kwargs = spec
+            fresh = self.factor_many(
+                solver_cls=solver_cls,
+                semiprimes=[semiprimes[i] for i in todo],
+                solver_kwargs=solver_kwargs,
+                max_workers=max_workers,
+                timeout=timeout,
+            )
+        else:
+            fresh = []
+            for i in todo:
+                result = solver.factor(semiprimes[i])
+                self.log_result(solver_name=solver.name, i=i, result=result)
+                fresh.append(result)
+        for i, result in zip(todo, fresh):
+            results[i] = result
+            if self.result_store is not None:
+                self.result_store.put(result)
+        return results
 
     def run_classic_implementation(
         self, 
         semiprimes: list = [], 
-        plot_results: bool = True
+        plot_results: bool = True,
+        max_workers: int = None,
         ):
         """ Run classic factorization implementation """
         self.run_implementation(
-            solver=ClassicalPrimeFactorization(verbose=self.verbose),
+            spec=solver_spec('classical', verbose=self.verbose),
+            semiprimes=semiprimes,
+            plot_results=plot_results,
+            max_workers=max_workers,
+        )
+
+    def run_classical_dispatcher_implementation(
+        self, 
+        semiprimes: list = [], 
+        plot_results: bool = True,
+        max_workers: int = None,
+        ):
+        """ Run the classical strategy dispatcher (trial division / Pollard-Brent 
+        rho / ECM picked by bit length) as a fast baseline """
+        self.run_implementation(
+            spec=solver_spec('dispatcher', verbose=self.verbose),
             semiprimes=semiprimes,
             plot_results=plot_results,
+            max_workers=max_workers,
         )
 
     def run_qiskit_implementation(
         self, 
         semiprimes: list = [],  
-        plot_results: bool = True):
+        plot_results: bool = True,
+        max_workers: int = None):
         """ Run the Qiskit implementation of Shor's algorithm """
         self.run_implementation(
-            solver=QiskitShor(verbose=self.verbose),
+            spec=solver_spec('qiskit', verbose=self.verbose),
             semiprimes=semiprimes,
             plot_results=plot_results,
+            max_workers=max_workers,
         )
 
+    def run_batched_qiskit_implementation(
+        self, 
+        semiprimes: list = [],  
+        plot_results: bool = True,
+        max_concurrent: int = 8,
+        max_batch_size: int = 16,
+        max_wait: float = 0.005):
+        """ Run the Qiskit implementation with max_concurrent semiprimes in flight, 
+        submitting every QPE circuit through one CircuitBatcher so circuits from 
+        different N are transpiled and simulated together. """
+        from qskt.batcher import CircuitBatcher
+        from qskt.solver import QiskitShor
+        batcher = CircuitBatcher(verbose=self.verbose, max_batch_size=max_batch_size, max_wait=max_wait)
+        try:
+            results = self.factor_threaded(
+                solver_factory=lambda: QiskitShor(verbose=self.verbose, batcher=batcher),
+                semiprimes=semiprimes,
+                max_concurrent=max_concurrent,
+            )
+        finally:
+            batcher.close()
+        self.info('batcher: %s', batcher.info())
+        if plot_results:
+            self.plot_results(
+                x=[result['N'] for result in results], 
+                y=[result['elapsed_seconds'] for result in results],
+                title='Time Required to Factor Semiprime into Primes (solver=QiskitShor, batched)',
+                fname='qiskitshorbatched.png'
+            )
+        return results
+
 if __name__ == "__main__":
+    from utils.semiprimes import SemiPrimeGenerator
     driver = Driver(verbose=True)
     semiprimes_generator = SemiPrimeGenerator()
     semiprimes = semiprimes_generator.get_n_semiprimes(
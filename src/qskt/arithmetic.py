@@ -0,0 +1,67 @@
+""" Classical helpers for the modular exponentiation part of Shor's
+algorithm, U|y> = |a*y mod N>.
+
+Multiplication by a mod N (with gcd(a, N) = 1) is just a permutation of
+the work register's basis states, so everything here is plain NumPy: the
+QPE circuit turns these permutations into gates, and the emulator backends
+apply them directly to a state vector.
+"""
+from math import gcd
+import numpy as np
+
+
+def work_register_size(N: int = None):
+    """ Number of work qubits needed to hold the values 0..N-1, i.e. ceil(log2 N)
+    for odd N. """
+    return max(1, (N - 1).bit_length())
+
+
+def counting_register_size(N: int = None):
+    """ Number of counting qubits for period finding mod N: 2*ceil(log2 N). With
+    that many bits the reading is within 1/(2r^2) of some s/r for every period
+    r < N, so the continued fraction expansion recovers s/r exactly. """
+    return 2 * work_register_size(N)
+
+
+def a2jmodN(a: int = None, j: int = None, N: int = None):
+    """ Compute a^(2^j) (mod N) by repeated squaring. """
+    for _ in range(j):
+        a = (a * a) % N
+    return a
+
+
+def controlled_powers(g: int = None, N: int = None, n_count: int = None):
+    """ Precompute g^(2^j) mod N for j = 0..n_count-1 so that counting qubit j
+    costs a single controlled multiplication instead of 2^j repeated ones. """
+    powers = []
+    a = g % N
+    for _ in range(n_count):
+        powers.append(a)
+        a = (a * a) % N
+    return powers
+
+
+def multiplication_permutation(a: int = None, N: int = None, num_qubits: int = None):
+    """ Return the basis-state permutation of multiplication by a mod N on a
+    num_qubits register as an index array perm where U|x> = |perm[x]>.
+    Values x >= N (which never occur when starting from |1>) are left alone
+    so the map stays a permutation. """
+    if gcd(a, N) != 1:
+        raise ValueError(f'a={a} is not invertible mod N={N}; multiplication is not unitary')
+    num_qubits = num_qubits or work_register_size(N)
+    x = np.arange(2 ** num_qubits, dtype=np.int64)
+    return np.where(x < N, (x * a) % N, x)
+
+
+def controlled_multiplication_matrix(a: int = None, N: int = None, num_qubits: int = None):
+    """ Unitary matrix of multiplication by a mod N on num_qubits work qubits,
+    controlled by one extra qubit. Using Qiskit's little-endian ordering with
+    the control as qubit 0, basis index 2*x + c means work value x and control
+    c: the c = 0 half is the identity and the c = 1 half is the permutation. """
+    num_qubits = num_qubits or work_register_size(N)
+    perm = multiplication_permutation(a=a, N=N, num_qubits=num_qubits)
+    x = np.arange(2 ** num_qubits, dtype=np.int64)
+    matrix = np.zeros((2 ** (num_qubits + 1), 2 ** (num_qubits + 1)), dtype=complex)
+    matrix[2 * x, 2 * x] = 1
+    matrix[2 * perm + 1, 2 * x + 1] = 1
+    return matrix
@@ -0,0 +1,148 @@
+""" Batched submission of QPE circuits to the Aer simulator.
+
+The QPE circuits in this project are small, so a single-circuit, single-shot
+Aer job is dominated by per-job overhead (transpiler setup, assembling the
+qobj, starting the simulator). A CircuitBatcher collects circuits submitted
+from many threads -- concurrent guesses of one QiskitShor (concurrency=K)
+or concurrent factor() calls for different N (Driver.factor_threaded) --
+transpiles the new ones together, runs them as one multi-experiment job and
+hands each caller its own measurement memory through a Future.
+
+A batch is flushed when it holds max_batch_size circuits or when max_wait
+seconds have passed since its first circuit arrived.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from itertools import groupby
+from base import Base
+from utils.timing import StageTimer
+
+
+class _PendingCircuit:
+    __slots__ = ('circuit', 'shots', 'transpiled', 'on_transpiled', 'run_options', 'future')
+
+    def __init__(self, circuit=None, shots: int = 1, transpiled: bool = True, on_transpiled=None,
+                 run_options: dict = None):
+        self.circuit = circuit
+        self.shots = shots
+        self.transpiled = transpiled
+        self.on_transpiled = on_transpiled
+        self.run_options = run_options or {}
+        self.future = Future()
+
+    def job_key(self):
+        """ Circuits with equal job keys can share one Aer job. """
+        return (self.shots, sorted(self.run_options.items()))
+
+
+class CircuitBatcher(Base):
+    def __init__(self, name: str = 'CircuitBatcher', verbose: bool = False, backend=None,
+                 max_batch_size: int = 16, max_wait: float = 0.005, timer: StageTimer = None):
+        """ backend is the Aer backend every batch runs on (default: a new
+        'aer_simulator'). timer, if given, records transpile/assemble/simulate
+        spans per batch. """
+        super().__init__(name, verbose)
+        if backend is None:
+            from qiskit import Aer
+            backend = Aer.get_backend('aer_simulator')
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.timer = timer if timer is not None else StageTimer(enabled=False)
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        # counters, for benchmarking
+        self.batches = 0
+        self.circuits = 0
+
+    def submit(self, circuit=None, shots: int = 1, transpiled: bool = True, on_transpiled=None,
+               run_options: dict = None):
+        """ Queue a circuit and return a Future for its get_memory() list.
+        Circuits with transpiled=False are transpiled with the rest of their batch
+        and passed to on_transpiled(circuit) (e.g. to fill the circuit cache).
+        run_options (e.g. from SimulatorConfig.options_for) are passed to backend.run;
+        only circuits with the same shots and options share a job. """
+        self._ensure_thread()
+        pending = _PendingCircuit(circuit=circuit, shots=shots, transpiled=transpiled,
+                                  on_transpiled=on_transpiled, run_options=run_options)
+        self._queue.put(pending)
+        return pending.future
+
+    def _ensure_thread(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                self._thread.start()
+
+    def info(self):
+        """ Batch counters: jobs run, circuits run and the mean circuits per job. """
+        return {
+            'batches': self.batches,
+            'circuits': self.circuits,
+            'mean_batch_size': self.circuits / self.batches if self.batches else None,
+        }
+
+    def close(self):
+        """ Flush what is queued and stop the batching thread. """
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stop = [first], False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stop = True
+                    break
+                batch.append(pending)
+            self._execute(batch)
+            if stop:
+                return
+
+    def _execute(self, batch: list = None):
+        """ Transpile the new circuits of a batch together, run one job per shot
+        count / run options and resolve every Future with its own experiment's memory. """
+        from qiskit import transpile, assemble
+        try:
+            raw = [pending for pending in batch if not pending.transpiled]
+            if raw:
+                with self.timer.span('transpile'):
+                    circuits = transpile([pending.circuit for pending in raw], self.backend)
+                for pending, circuit in zip(raw, circuits):
+                    pending.circuit = circuit
+                    if pending.on_transpiled is not None:
+                        pending.on_transpiled(circuit)
+            batch = sorted(batch, key=_PendingCircuit.job_key)
+            for (shots, _), group in groupby(batch, key=_PendingCircuit.job_key):
+                group = list(group)
+                with self.timer.span('assemble'):
+                    qobj = assemble([pending.circuit for pending in group], shots=shots)
+                with self.timer.span('simulate'):
+                    result = self.backend.run(qobj, memory=True, **group[0].run_options).result()
+                for i, pending in enumerate(group):
+                    pending.future.set_result(result.get_memory(i))
+            self.batches += 1
+            self.circuits += len(batch)
+            self.debug('ran batch of %s circuits (%s new)', len(batch), len(raw))
+        except Exception as e:
+            self.error('batch of %s circuits failed: %s', len(batch), e)
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
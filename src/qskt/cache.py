@@ -0,0 +1,119 @@
+""" Cache of built + transpiled Quantum Phase Estimation circuits.
+
+Building the QPE circuit (n_count controlled U^(2^j) gates, each created
+with to_gate().control()) and transpiling it for Aer costs far more than
+the single-shot simulation itself, and the same (g, N) is tried again and
+again across factor() calls and benchmark repetitions. This module keeps
+a bounded in-memory LRU of transpiled circuits with an optional on-disk
+tier serialized with QPY, so a fresh process can skip both steps.
+"""
+import hashlib
+import os
+from collections import OrderedDict
+from threading import Lock
+
+CIRCUIT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'cache', 'circuits')
+
+
+class TranspiledCircuitCache:
+    def __init__(self, maxsize: int = 128, cache_dir: str = None):
+        """ maxsize bounds the number of circuits kept in memory.
+        cache_dir enables the on-disk QPY tier (None keeps it memory only). """
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self._circuits = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(g: int = None, N: int = None, n_count: int = None, backend_options: dict = None):
+        """ Hashable key for a QPE circuit built for (g, N, n_count) and
+        transpiled against a backend with the given options. """
+        return (g, N, n_count, tuple(sorted((backend_options or {}).items())))
+
+    def _path(self, key):
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f'{digest}.qpy')
+
+    def _load(self, key):
+        """ Look the key up in the on-disk tier. """
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        from qiskit import qpy
+        with open(path, 'rb') as f:
+            return qpy.load(f)[0]
+
+    def _dump(self, key, circuit):
+        """ Write the circuit to the on-disk tier atomically. """
+        if not self.cache_dir:
+            return
+        from qiskit import qpy
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            qpy.dump(circuit, f)
+        os.replace(tmp_path, path)
+
+    def _remember(self, key, circuit):
+        with self._lock:
+            self._circuits[key] = circuit
+            self._circuits.move_to_end(key)
+            while len(self._circuits) > self.maxsize:
+                self._circuits.popitem(last=False)
+
+    def get(self, key):
+        """ Return the cached circuit for key from either tier, or None on a miss. """
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is not None:
+                self._circuits.move_to_end(key)
+                self.hits += 1
+                return circuit
+        circuit = self._load(key)
+        if circuit is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._remember(key, circuit)
+        return circuit
+
+    def put(self, key, circuit):
+        """ Cache a circuit built and transpiled elsewhere (e.g. by a batch transpile). """
+        self._dump(key, circuit)
+        self._remember(key, circuit)
+
+    def get_or_build(self, key, build):
+        """ Return the cached circuit for key, calling build() to create
+        (and cache) it on a miss in both tiers. """
+        circuit = self.get(key)
+        if circuit is None:
+            circuit = build()
+            self.put(key, circuit)
+        return circuit
+
+    def info(self):
+        """ Hit/miss counters, in the spirit of functools.lru_cache's cache_info. """
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'size': len(self._circuits),
+            'maxsize': self.maxsize,
+        }
+
+    def clear(self):
+        """ Drop the in-memory tier and reset the counters (disk is untouched). """
+        with self._lock:
+            self._circuits.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+
+# shared by every QuantumPhaseEstimator that is not given its own cache, so
+# circuits survive across solver instances within one process
+default_circuit_cache = TranspiledCircuitCache()
@@ -0,0 +1,69 @@
+""" NumPy emulator backend for the QPE period-finding circuit.
+
+For the small N we actually run through Qiskit, every controlled U^(2^j)
+is a permutation of the work register's basis states, so a full Aer
+statevector run is overkill. After the controlled multiplications counting
+state |k> is paired with work value g^k mod N, so with r the order of g
+the counting states split into r residue classes k = k0 (mod r), one per
+work value. The inverse QFT maps each class to a geometric sum, and the
+reading distribution has the closed form
+
+    P(m) = 1/M^2 * sum_{k0 < r} |sum_{j < c(k0)} e^(-2 pi i j r m / M)|^2,
+    c(k0) = #{j : k0 + j*r < M}
+
+with only two distinct values of c(k0). This backend evaluates it exactly
+in O(M) memory, whatever r, and samples readings in the same bitstring
+format as result.get_memory(). It does not import Qiskit.
+"""
+from functools import lru_cache
+import numpy as np
+from classical.order import auto_order
+
+
+class PermutationStateEmulator:
+    def __init__(self, seed: int = None):
+        self.rng = np.random.default_rng(seed)
+
+    def spawn(self):
+        """ A new emulator with its own generator seeded from this one, for use
+        on another thread (Generators are not thread-safe). """
+        return PermutationStateEmulator(seed=int(self.rng.integers(2 ** 63)))
+
+    def probabilities(self, g: int = None, N: int = None, n_count: int = 8):
+        """ Exact distribution of the counting register reading after the
+        inverse QFT, as an array of length 2^n_count. Cached per (g, N, n_count). """
+        return _reading_distribution(g, N, n_count)
+
+    def run(self, g: int = None, N: int = None, n_count: int = 8, shots: int = 1):
+        """ Sample `shots` readings of the counting register, formatted like
+        Qiskit's result.get_memory() (most significant bit first). """
+        readings = self.rng.choice(
+            2 ** n_count, size=shots, p=self.probabilities(g=g, N=N, n_count=n_count))
+        return [format(int(m), f'0{n_count}b') for m in readings]
+
+
+@lru_cache(maxsize=128)
+def _reading_distribution(g: int = None, N: int = None, n_count: int = 8):
+    """ Exact reading probabilities of the QPE circuit for (g, N, n_count). Module
+    level so the cache is shared by every emulator instance in the process. """
+    M = 2 ** n_count
+    r = auto_order(g % N, N)
+    # residue classes k0 < M % r hold ceil(M / r) counting states, the others floor(M / r)
+    long_count, short_count = -(-M // r), M // r
+    long_classes = M % r
+    m = np.arange(M)
+    # half the angle between consecutive terms j, j+1 of a class's geometric sum
+    half_angle = np.pi * ((r * m) % M) / M
+    sin_half = np.sin(half_angle)
+    aligned = sin_half == 0  # every term in phase: |sum| = count
+    safe_sin = np.where(aligned, 1.0, sin_half)
+
+    def class_power(count):
+        # |sum_{j < count} e^(2 i j half_angle)|^2 = sin^2(count half_angle) / sin^2(half_angle)
+        return np.where(aligned, float(count) ** 2, np.sin(count * half_angle) ** 2 / safe_sin ** 2)
+
+    probabilities = long_classes * class_power(long_count)
+    if r > long_classes:
+        probabilities = probabilities + (r - long_classes) * class_power(short_count)
+    probabilities /= M * M
+    return probabilities / probabilities.sum()
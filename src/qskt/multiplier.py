@@ -0,0 +1,139 @@
+""" Gate-level controlled modular multiplication, U|x> = |a*x mod N>, after
+Beauregard, "Circuit for Shor's algorithm using 2n+3 qubits" (2003).
+
+Everything is built from Draper's QFT adder: once a register b holds
+QFT|b>, adding a classical constant a is one phase gate per qubit, with
+no carries. From it:
+
+* phi_add_mod: b -> (b + a) mod N for b, a < N, on n+1 qubits plus one
+  ancilla that is returned to |0>;
+* multiply_add: b -> (b + a*x) mod N, one modular addition of a*2^i mod N
+  per bit x_i of the work register;
+* controlled_multiplier: multiply_add(a), swap x with b, then undo
+  multiply_add(a^-1), which leaves x -> a*x mod N and b back at 0.
+
+With n = ceil(log2 N) work qubits the gate acts on 1 + n + (n + 2) qubits
+and has O(n^3) gates, instead of the 2^(n+1) x 2^(n+1) matrix of
+arithmetic.controlled_multiplication_matrix.
+Qiskit is imported at module level, so import this module lazily.
+"""
+from math import pi
+from qiskit import QuantumCircuit
+from .arithmetic import work_register_size
+
+
+def qft(circuit: QuantumCircuit = None, qubits: list = None, inverse: bool = False):
+    """ Append the QFT (without the final swaps) or its inverse on qubits, least
+    significant first. Afterwards qubit k carries phase 2 pi b / 2^(k+1)
+    (reversed order: the most significant qubit gets the finest phase). """
+    m = len(qubits)
+    ops = []
+    for j in reversed(range(m)):
+        ops.append(('h', j, None))
+        for k in reversed(range(j)):
+            ops.append(('cp', j, k))
+    if inverse:
+        ops.reverse()
+    for op, j, k in ops:
+        if op == 'h':
+            circuit.h(qubits[j])
+        else:
+            angle = pi / 2 ** (j - k)
+            circuit.cp(-angle if inverse else angle, qubits[k], qubits[j])
+
+
+def phi_add(circuit: QuantumCircuit = None, qubits: list = None, a: int = None,
+            controls: list = (), inverse: bool = False):
+    """ Add (or subtract, with inverse=True) the constant a to a register in
+    Fourier space, controlled on every qubit in controls. """
+    for j in range(len(qubits)):
+        # qubit j holds the phase 2 pi b / 2^(j+1), so adding a rotates it by 2 pi a / 2^(j+1)
+        angle = 2 * pi * (a % 2 ** (j + 1)) / 2 ** (j + 1)
+        if inverse:
+            angle = -angle
+        if angle == 0:
+            continue
+        if controls:
+            circuit.mcp(angle, list(controls), qubits[j])
+        else:
+            circuit.p(angle, qubits[j])
+
+
+def phi_add_mod(circuit: QuantumCircuit = None, qubits: list = None, ancilla: int = None,
+                a: int = None, N: int = None, controls: list = (), inverse: bool = False):
+    """ Controlled b -> (b + a) mod N on the n+1 qubit Fourier-space register qubits
+    (b < N, a < N), using one ancilla that starts and ends in |0>. inverse=True
+    appends the inverse, b -> (b - a) mod N. """
+    steps = _phi_add_mod_steps(qubits=qubits, ancilla=ancilla, a=a, N=N, controls=controls)
+    if inverse:
+        steps = [(step, not step_inverse) for step, step_inverse in reversed(steps)]
+    for step, step_inverse in steps:
+        step(circuit, step_inverse)
+
+
+def _phi_add_mod_steps(qubits: list = None, ancilla: int = None, a: int = None, N: int = None,
+                       controls: list = ()):
+    """ Beauregard's figure 5 as a list of (step, inverse) pairs, so the whole
+    modular adder can be appended forwards or backwards. """
+    top = qubits[-1]
+
+    def add_a(circuit, inverse):
+        phi_add(circuit, qubits, a, controls=controls, inverse=inverse)
+
+    def add_n(circuit, inverse):
+        phi_add(circuit, qubits, N, inverse=inverse)
+
+    def add_n_if_negative(circuit, inverse):
+        phi_add(circuit, qubits, N, controls=[ancilla], inverse=inverse)
+
+    def flag_negative(circuit, inverse):
+        # the top bit of b - N is set exactly when b < N wrapped around
+        qft(circuit, qubits, inverse=True)
+        circuit.cx(top, ancilla)
+        qft(circuit, qubits)
+
+    def unflag(circuit, inverse):
+        # after removing a again the top bit is clear exactly when the ancilla was set
+        qft(circuit, qubits, inverse=True)
+        circuit.x(top)
+        circuit.cx(top, ancilla)
+        circuit.x(top)
+        qft(circuit, qubits)
+
+    return [
+        (add_a, False),
+        (add_n, True),
+        (flag_negative, False),
+        (add_n_if_negative, False),
+        (add_a, True),
+        (unflag, False),
+        (add_a, False),
+    ]
+
+
+def multiply_add(circuit: QuantumCircuit = None, control: int = None, x: list = None,
+                 b: list = None, ancilla: int = None, a: int = None, N: int = None,
+                 inverse: bool = False):
+    """ Controlled b -> (b + a*x) mod N (or its inverse), Beauregard's figure 6. """
+    qft(circuit, b)
+    bits = range(len(x))
+    for i in (reversed(bits) if inverse else bits):
+        phi_add_mod(circuit, b, ancilla, a * 2 ** i % N, N, controls=[control, x[i]], inverse=inverse)
+    qft(circuit, b, inverse=True)
+
+
+def controlled_multiplier(a: int = None, N: int = None, num_qubits: int = None):
+    """ Circuit for multiplication by a mod N (gcd(a, N) = 1) on num_qubits work
+    qubits, controlled by qubit 0. Qubits 1..num_qubits are the work register; the
+    num_qubits + 2 ancillas after them (the accumulator b and the modular adder's
+    overflow flag) must start in |0> and end there. """
+    n = num_qubits or work_register_size(N)
+    a_inverse = pow(a, -1, N)  # raises ValueError unless gcd(a, N) = 1
+    circuit = QuantumCircuit(1 + n + n + 2)
+    control, x = 0, list(range(1, n + 1))
+    b, ancilla = list(range(n + 1, 2 * n + 2)), 2 * n + 2
+    multiply_add(circuit, control, x, b, ancilla, a, N)
+    for xi, bi in zip(x, b):
+        circuit.cswap(control, xi, bi)
+    multiply_add(circuit, control, x, b, ancilla, a_inverse, N, inverse=True)
+    return circuit
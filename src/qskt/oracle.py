@@ -0,0 +1,91 @@
+""" Analytic "fast oracle" backend for QPE period finding.
+
+For guess g with order r mod N, the QPE circuit started from |1> measures
+the counting register (M = 2^n_count) with probability
+
+    P(m) = 1/r * sum_{s=0}^{r-1} F(s/r - m/M),
+    F(d) = sin^2(pi*M*d) / (M^2 * sin^2(pi*d))
+
+i.e. a uniform mixture over s of Fejer (sinc^2) peaks centred on s*M/r.
+This backend computes r classically once per (g, N) and samples readings
+straight from that closed form: pick s uniformly, then pick the offset
+from the peak exactly within a small window and by rejection sampling in
+the 1/d^2 tail. The result has the same distribution as the simulator but
+costs microseconds per shot and no memory beyond the window, so it works
+for counting registers far too large for any statevector.
+"""
+import random
+from math import sin, pi
+from classical.order import get_order_finding_engine
+
+# offsets |j| < WINDOW from the peak are sampled exactly, the rest by rejection
+WINDOW = 32
+
+
+class AnalyticPhaseOracle:
+    def __init__(self, seed: int = None, order_finder='auto'):
+        self.rng = random.Random(seed)
+        self.order_finder = order_finder
+        self.find_order = get_order_finding_engine(order_finder)
+        self._orders = {}
+
+    def spawn(self):
+        """ A new oracle with its own RNG seeded from this one (and the same order
+        cache), for use on another thread. """
+        oracle = AnalyticPhaseOracle(seed=self.rng.getrandbits(64), order_finder=self.order_finder)
+        oracle._orders = self._orders
+        return oracle
+
+    def order(self, g: int = None, N: int = None):
+        """ Order of g mod N, computed classically once per (g, N). """
+        key = (g, N)
+        if key not in self._orders:
+            self._orders[key] = self.find_order(g, N)
+        return self._orders[key]
+
+    @staticmethod
+    def _offset_probability(j: int = None, f: float = None, M: int = None):
+        """ Probability of reading base + j when the peak sits at base + f, 0 < f < 1. """
+        return sin(pi * f) ** 2 / (M * M * sin(pi * (j - f) / M) ** 2)
+
+    def _sample_offset(self, f: float = None, M: int = None):
+        """ Sample j (with m = base + j mod M) from the Fejer distribution of a
+        peak at fractional offset f. j ranges over M consecutive integers
+        -M/2 < j <= M/2, where sin(pi*|j - f|/M) >= 2*|j - f|/M holds. """
+        low, high = -(M // 2) + 1, M // 2
+        if M <= 2 * WINDOW:
+            window = range(low, high + 1)
+        else:
+            window = range(-(WINDOW - 1), WINDOW)
+        weights = [self._offset_probability(j, f, M) for j in window]
+        window_mass = sum(weights)
+        if M <= 2 * WINDOW or self.rng.random() < window_mass:
+            return self.rng.choices(window, weights=weights)[0]
+        # Tail |j| >= WINDOW. With t = |j| - 1 <= |j - f|, the target is bounded by
+        # sin^2(pi*f) / (4 t^2). Propose t from q(t) = (K-1) / (t (t+1)), t >= K-1
+        # (K = WINDOW), which satisfies 1/t^2 <= 2 q(t) / (K-1), plus a random sign,
+        # and accept with probability target / envelope.
+        bound = sin(pi * f) ** 2 / (WINDOW - 1)
+        while True:
+            t = int((WINDOW - 1) / (1.0 - self.rng.random()))
+            j = t + 1 if self.rng.random() < 0.5 else -(t + 1)
+            if not low <= j <= high:
+                continue
+            q = (WINDOW - 1) / (t * (t + 1))
+            if self.rng.random() * bound * q / 2 < self._offset_probability(j, f, M):
+                return j
+
+    def sample_reading(self, r: int = None, M: int = None):
+        """ Sample one counting register value m from the QPE output distribution. """
+        s = self.rng.randrange(r)
+        base, remainder = divmod(s * M, r)
+        if remainder == 0:
+            # s/r is exactly representable with n_count bits: a single sharp peak
+            return base
+        return (base + self._sample_offset(remainder / r, M)) % M
+
+    def run(self, g: int = None, N: int = None, n_count: int = 8, shots: int = 1):
+        """ Sample `shots` readings, formatted like Qiskit's result.get_memory(). """
+        r = self.order(g, N)
+        M = 2 ** n_count
+        return [format(self.sample_reading(r, M), f'0{n_count}b') for _ in range(shots)]
@@ -10,12 +10,15 @@ class QuantumFourierTransform(Base):
         super().__init__(name, verbose=verbose)
     
 
-    def qft_dagger(self, n):
+    def qft_dagger(self, n, min_angle: float = 0.0):
         """Apply N-qubit QFTdagger to the first n qubits of a circuit.
         
         QFT dagger is the conjugate transpose of the Quantum Fourier Transform,
         where the quantum fourier transform is used to find a frequency of a 
         given superposition. 
+        min_angle > 0 gives the approximate QFT: controlled-phase rotations smaller 
+        than min_angle (radians) are dropped, which removes most of the O(n^2) 
+        gates for wide registers at the cost of a small error in the phases.
         """ 
         # Defining a new quantum circuit of n qubits. 
         circuit = QuantumCircuit(n)
@@ -38,6 +41,8 @@ class QuantumFourierTransform(Base):
                 # phase/rotation on the state of the target qubit, depending on the control state.
                 # Define the rotation angle as (-pi) / 2^(j-m)
                 rotation_angle = -pi/float(2**(j-m))
+                if abs(rotation_angle) < min_angle:
+                    continue
                 # apply the controlled-phase gate to qubit j using that rotation angle, 
                 # using m as the control qubit, and using j as the target qubit
                 circuit.cp(rotation_angle, control_qubit=m, target_qubit=j)
@@ -2,44 +2,147 @@
 solution to the period finding problem was to use quantum 
 phase estimation on the unitary operator:
 $$U| y \rangle = | gy \text{ mod } N \rangle$$
+
+Qiskit is imported lazily, only when the 'aer' backend is used, so the 
+NumPy 'emulator' backend works in processes that never import Qiskit.
 """
-from qiskit import QuantumCircuit, Aer, transpile, assemble
-from math import gcd 
-import numpy as np
+import copy
+import logging
+import threading
+from math import gcd, pi
 from base import Base 
-from .qft import QuantumFourierTransform
+from .arithmetic import (
+    a2jmodN, controlled_powers, controlled_multiplication_matrix, counting_register_size,
+    work_register_size
+)
+from .batcher import CircuitBatcher
+from .cache import TranspiledCircuitCache, default_circuit_cache
+from .simulator import SimulatorConfig
+from .emulator import PermutationStateEmulator
+from .oracle import AnalyticPhaseOracle
+from utils.timing import StageTimer
+from fractions import Fraction
+
+QPE_BACKENDS = ('aer', 'emulator', 'analytic')
+# 'full': n_count counting qubits and the QFT-dagger network; 'semiclassical': one 
+# recycled control qubit with measured, classically controlled phase corrections
+QFT_MODES = ('full', 'semiclassical')
+# 'unitary': one dense permutation matrix per multiplier, run natively by Aer (the default, 
+# far cheaper to simulate at the sizes we run); 'adder': gate-level controlled multipliers 
+# built from QFT adders (qskt/multiplier.py), polynomial in ceil(log2 N) but with 
+# ceil(log2 N) + 2 extra qubits
+MULTIPLIERS = ('unitary', 'adder')
+
 class QuantumPhaseEstimator(Base):
 
-    def __init__(self, name: str = 'QPE', verbose: bool = False):
+    def __init__(self, name: str = 'QPE', verbose: bool = False, 
+                 circuit_cache: TranspiledCircuitCache = None,
+                 backend: str = 'aer', seed: int = None, timer: StageTimer = None,
+                 batcher: CircuitBatcher = None, simulator: SimulatorConfig = None,
+                 qft_mode: str = 'full', min_rotation_angle: float = 0.0,
+                 multiplier: str = 'unitary'):
+        """ circuit_cache holds built + transpiled circuits keyed by 
+        (g, N, n_count, backend options); defaults to the process-wide cache. 
+        backend selects where readings come from: 'aer' simulates the Qiskit circuit, 
+        'emulator' uses the NumPy permutation-state emulator and 'analytic' samples the 
+        closed-form QPE output distribution from the classically computed order 
+        (both seeded with seed). 
+        timer collects per-stage spans (building the c_amodN gates, qft_dagger, transpile, 
+        assemble, simulate); by default a disabled StageTimer that records nothing. 
+        batcher (aer backend only) sends circuits through a shared CircuitBatcher, which 
+        runs them together with those of other guesses / other N as one Aer job; the 
+        batcher's backend is then used for transpiling and simulating. 
+        simulator (aer backend only) sets the Aer method, precision, threads and memory 
+        budget (see qskt/simulator.py); circuits whose statevector plus dense gates exceed 
+        the budget switch to the fallback method or raise SimulatorMemoryError before 
+        they are built. 
+        qft_mode (aer backend) picks the 'full' inverse QFT on n_count counting qubits or 
+        the 'semiclassical' one on a single recycled control qubit (see 
+        build_semiclassical_circuit), which simulates 1 + ceil(log2 N) qubits however wide 
+        the counting register is. min_rotation_angle > 0 drops phase rotations smaller 
+        than that many radians in either mode (approximate QFT). The emulator and 
+        analytic backends always sample the exact full-QFT distribution. 
+        multiplier (aer backend) builds each controlled U^(2^j) as a dense permutation 
+        matrix ('unitary') or, opt-in, from QFT adders ('adder', see qskt/multiplier.py; 
+        about 6x slower to simulate for N=15 because of the n + 2 ancillas). """
         super().__init__(name, verbose)
-        self.qft = QuantumFourierTransform()
+        if backend not in QPE_BACKENDS:
+            raise ValueError(f'unknown QPE backend {backend!r}; choose from {QPE_BACKENDS}')
+        if qft_mode not in QFT_MODES:
+            raise ValueError(f'unknown QFT mode {qft_mode!r}; choose from {QFT_MODES}')
+        if multiplier not in MULTIPLIERS:
+            raise ValueError(f'unknown multiplier {multiplier!r}; choose from {MULTIPLIERS}')
+        self.backend = backend
+        self.qft_mode = qft_mode
+        self.min_rotation_angle = min_rotation_angle
+        self.multiplier = multiplier
+        self._qft = None
+        self.circuit_cache = circuit_cache if circuit_cache is not None else default_circuit_cache
+        self.backend_options = {}
+        # number of simulator (or emulator/oracle) runs, for benchmarking
+        self.simulator_calls = 0
+        self._calls_lock = threading.Lock()
+        self.timer = timer if timer is not None else StageTimer(enabled=False)
+        self.batcher = batcher
+        self.simulator = simulator if simulator is not None else SimulatorConfig()
+        if backend == 'aer' and batcher is not None:
+            self.aer_sim = batcher.backend
+        elif backend == 'aer':
+            from qiskit import Aer
+            self.aer_sim = Aer.get_backend('aer_simulator')
+        elif backend == 'emulator':
+            self.emulator = PermutationStateEmulator(seed=seed)
+        else:
+            self.oracle = AnalyticPhaseOracle(seed=seed)
+
+    def for_attempt(self, timer: StageTimer = None):
+        """ A copy of this estimator for one attempt running on its own thread. It 
+        shares the circuit cache, simulator and batcher, but has its own timer 
+        (timer, or a new one enabled like this one's), its own simulator_calls counter 
+        and, for the emulator and analytic backends, its own RNG spawned from this one's, 
+        so a losing attempt that is still running never touches the solver's state. """
+        attempt = copy.copy(self)
+        attempt.timer = timer if timer is not None else StageTimer(enabled=self.timer.enabled)
+        attempt.simulator_calls = 0
+        attempt._calls_lock = threading.Lock()
+        if self.backend == 'emulator':
+            attempt.emulator = self.emulator.spawn()
+        elif self.backend == 'analytic':
+            attempt.oracle = self.oracle.spawn()
+        return attempt
+
+    @property
+    def qft(self):
+        """ QuantumFourierTransform helper, created on first use (it imports Qiskit) """
+        if self._qft is None:
+            from .qft import QuantumFourierTransform
+            self._qft = QuantumFourierTransform()
+        return self._qft
         
     def a2jmodN(self, a: int = None, j: int = None, N: int = None):
         """Compute a^{2^j} (mod N) by repeated squaring. 
-        This method is intended to provide some scalability to this algorithm 
-        by removing the statically set N=15 requirement used in the docs.
-        This is not currently used as I am not yet sure where to leverage it. 
+        Used (via controlled_powers) to precompute the multiplier of every 
+        controlled U^(2^j), which removes the statically set N=15 requirement used in the docs.
         """
-        for _ in range(j):
-            a = np.mod(a**2, N)
-        return a
+        return a2jmodN(a=a, j=j, N=N)
 
-    def quantum_phase_estimation_g_mod_n(self, g: int = None, N: int = None ):
-        """ 
-        Apply quantum phase estimation to estimate the phase for some "bad" integer guess g
-        and some large number N whose factors need to be determined. 
-        We want to find the period p such that g^p = m * N + 1, or g^p mod (m * N) = 1.
-        """
-        # Here we define the number of "counting qubits" such that we can 'count' on the
-        # first n_count qubits of our circuit. 
-        n_count = 8 
+    def build_circuit(self, g: int = None, N: int = None, n_count: int = 8):
+        """ Build the (untranspiled) QPE circuit for guess g and number N 
+        with n_count counting qubits, or their semiclassical equivalent. """
+        if self.qft_mode == 'semiclassical':
+            return self.build_semiclassical_circuit(g=g, N=N, n_count=n_count)
+        from qiskit import QuantumCircuit
+        # The work register that the unitary operator U acts on needs enough qubits 
+        # to hold every remainder 0..N-1, i.e. ceil(log2 N) of them, followed by 
+        # the multiplier's ancillas (none for the dense unitary).
+        n_work = work_register_size(N) + self.ancilla_qubits(N)
 
         # Create a quantum circuit; when defining the circuit, 
-        # we add an extra 4 qubits for the unitary operator U
-        # to act on. This will have n_count + 4 quantum registers and just
+        # we add an extra n_work qubits for the unitary operator U
+        # to act on. This will have n_count + n_work quantum registers and just
         # n_count classical registers. The classical registers are to 
         # allow the mapping of quantum measurement results to classical bits.
-        circuit = QuantumCircuit(4 + n_count, n_count)
+        circuit = QuantumCircuit(n_work + n_count, n_count)
 
         # for those first n_count counting qubits, we want to initialize each one 
         # to a superposition state using an H (Hadamard) gate.
@@ -50,102 +153,259 @@ class QuantumPhaseEstimator(Base):
         for q in range(n_count):
             circuit.h(q) 
 
-        # apply single-qubit Pauli-X gate to the last qubit.
+        # apply single-qubit Pauli-X gate to the lowest work qubit so the work register
+        # starts in the state |1>.
         # the Pauli-X gate is equivalent to a classical bit flip, i.e. where 0 becomes 1 and
         # 1 becomes 0.
-        circuit.x(3+n_count) 
+        circuit.x(n_count) 
+
+        # U^(2^i) is multiplication by g^(2^i) mod N, and g^(2^i) mod N can be 
+        # precomputed classically by repeated squaring. So each counting qubit costs 
+        # a single controlled multiplication rather than 2^i repetitions of U.
+        multipliers = controlled_powers(g=g, N=N, n_count=n_count)
 
         # For each of the n_count "counting qubits", do controlled U operations 
-        for qubit in range(n_count): 
-            # for qubit i, append to the circuit a controlled U gate 
-            # representing U^(2^i) repeated g mod N circuits (with each repetition multiplying on itself)
-            # we ultimately want to obtain a phase s / p where g^p mod N = 1. 
-            # This allows us to represent a superposition of all remainders r where 
-            # each r_i = (guess ^ 2^i) mod N
-            # We can then use that superposition of all remainders to find a period as discussed in the README.
-            controlled_gate_instruction = self.c_amodN(g=g, p=2**qubit, N=N)
-            # Append instruction to end of circuit, modifying in place.
-            circuit.append(
-                controlled_gate_instruction,
-                [qubit] + [i + n_count for i in range(4)]
-            )
+        with self.timer.span('c_amodN'):
+            for qubit in range(n_count): 
+                # for qubit i, append to the circuit a controlled U gate 
+                # representing U^(2^i), i.e. multiplication by g^(2^i) mod N.
+                # we ultimately want to obtain a phase s / p where g^p mod N = 1. 
+                # This allows us to represent a superposition of all remainders r where 
+                # each r_i = (guess ^ 2^i) mod N
+                # We can then use that superposition of all remainders to find a period as discussed in the README.
+                controlled_gate_instruction = self.c_amodN(g=multipliers[qubit], p=1, N=N)
+                # Append instruction to end of circuit, modifying in place.
+                circuit.append(
+                    controlled_gate_instruction,
+                    [qubit] + [i + n_count for i in range(n_work)]
+                )
 
         # We now have a superposition of all remainders r. 
         # We want to use the Quantum Fourier Transform to obtain a frequency from that superposition/wave function.
         # first, we need to append a QFTDagger gate (conjugate transpose of the QFT) to the circuit
         # to apply the inverse of the Quantum Fourier Transformation 
         # to the first n_count qubits of the circuit as defined above.
-        circuit.append(self.qft.qft_dagger(n_count), range(n_count)) # Do inverse-QFT
+        with self.timer.span('qft_dagger'):
+            circuit.append(self.qft.qft_dagger(n_count, min_angle=self.min_rotation_angle), range(n_count)) # Do inverse-QFT
 
         # We want to measure the results from the first n_count qubits, and 
         # map those results into corresponding n_count classical bits of our quantum circuit.
         circuit.measure(range(n_count), range(n_count))
 
-        # We use the AER simulator to simulate results. 
-        aer_sim = Aer.get_backend('aer_simulator')
-        # Setting memory=True below allows us to see a list of each sequential reading
-        t_circuit = transpile(circuit, aer_sim)
-        qobj = assemble(t_circuit, shots=1)
-        # Obtain the result from the simulation and print / display those results.
-        result = aer_sim.run(qobj, memory=True).result()
-        readings = result.get_memory()
-        self.info("Register Reading: " + readings[0])
+        return circuit
+
+    def build_semiclassical_circuit(self, g: int = None, N: int = None, n_count: int = 8):
+        """ QPE with a semiclassical inverse QFT (Kitaev; Beauregard's 2n+3 qubit 
+        circuit uses the same trick): the n_count counting qubits are replaced by one 
+        control qubit that is reused n_count times. 
+
+        The controlled powers are applied from U^(2^(n_count-1)) down to U^1. The step 
+        for U^(2^k) yields reading bit b = n_count-1-k, and its control qubit carries 
+        the phase 0.x_b x_(b-1) ... x_0 (in reading bits), so the bits measured in the 
+        earlier steps are removed with phase rotations -pi/2^(b-b') conditioned on 
+        classical bit b' (the same angles as the controlled-phase gates of qft_dagger). 
+        A Hadamard and a mid-circuit measurement then give bit b, and the qubit is reset 
+        for the next step. Readings have the same layout as the full circuit's. """
+        from qiskit import QuantumCircuit
+        n_work = work_register_size(N) + self.ancilla_qubits(N)
+        # qubit 0 is the recycled control, qubits 1..n_work the work register (and ancillas)
+        circuit = QuantumCircuit(1 + n_work, n_count)
+        circuit.x(1)  # work register starts in |1>
+        multipliers = controlled_powers(g=g, N=N, n_count=n_count)
+        for step, k in enumerate(reversed(range(n_count))):
+            b = n_count - 1 - k
+            if step:
+                circuit.reset(0)
+            circuit.h(0)
+            with self.timer.span('c_amodN'):
+                circuit.append(self.c_amodN(g=multipliers[k], p=1, N=N), range(1 + n_work))
+            with self.timer.span('qft_dagger'):
+                for earlier in range(b):
+                    angle = -pi / 2 ** (b - earlier)
+                    if abs(angle) < self.min_rotation_angle:
+                        continue
+                    circuit.p(angle, 0).c_if(circuit.clbits[earlier], 1)
+                circuit.h(0)
+            circuit.measure(0, b)
+        return circuit
+
+    def ancilla_qubits(self, N: int = None):
+        """ Ancilla qubits the controlled multipliers for N need next to the work register. """
+        if self.multiplier == 'unitary':
+            return 0
+        return work_register_size(N) + 2
+
+    def circuit_qubits(self, N: int = None, n_count: int = 8):
+        """ Number of qubits the simulator holds for the QPE circuit of N. """
+        counting = 1 if self.qft_mode == 'semiclassical' else n_count
+        return counting + work_register_size(N) + self.ancilla_qubits(N)
+
+    def gates_mb(self, N: int = None, n_count: int = 8):
+        """ Memory in MiB of the dense controlled-multiplication gates of the QPE circuit 
+        of N: one 2^(n_work+1) square matrix per counting bit, in either QFT mode, 
+        with the 'unitary' multiplier (the adder-based one has no dense gates). """
+        if self.multiplier != 'unitary':
+            return 0.0
+        return self.simulator.unitary_mb(work_register_size(N) + 1, count=n_count)
+
+    def circuit_report(self, g: int = None, N: int = None, n_count: int = 8):
+        """ Gate count and depth of the QPE circuit in the current QFT mode, with the 
+        QFT-dagger block expanded so both modes are counted in the same gates. 
+        The controlled multiplications stay single gates. """
+        self.run_options(N=N, n_count=n_count)  # memory guard before building anything
+        circuit = self.build_circuit(g=g, N=N, n_count=n_count)
+        if self.qft_mode == 'full':
+            circuit = circuit.decompose(gates_to_decompose=['QFT†'])
+        return {
+            'qft_mode': self.qft_mode,
+            'min_rotation_angle': self.min_rotation_angle,
+            'n_count': n_count,
+            'qubits': circuit.num_qubits,
+            'size': circuit.size(),
+            'depth': circuit.depth(),
+            'ops': dict(circuit.count_ops()),
+        }
 
-        # Cast the register reading to an integer and divide by 2 to the power of n_count
+    def run_options(self, N: int = None, n_count: int = 8):
+        """ Aer run options for the QPE circuit of N, after the simulator config's 
+        memory guard (statevector plus dense gates). """
+        return self.simulator.options_for(self.circuit_qubits(N=N, n_count=n_count),
+                                          gates_mb=self.gates_mb(N=N, n_count=n_count))
+
+    def circuit_key(self, g: int = None, N: int = None, n_count: int = 8):
+        """ Circuit cache key for (g, N, n_count) on this estimator's simulator """
+        options = self.run_options(N=N, n_count=n_count)
+        return self.circuit_cache.make_key(
+            g=g, N=N, n_count=n_count, 
+            backend_options={'backend': self.aer_sim.name(), 'method': options['method'],
+                             'precision': options['precision'], 'qft_mode': self.qft_mode,
+                             'min_rotation_angle': self.min_rotation_angle,
+                             'multiplier': self.multiplier, **self.backend_options}
+        )
+
+    def submit_to_batcher(self, g: int = None, N: int = None, n_count: int = 8, shots: int = 1):
+        """ Queue the QPE circuit for (g, N, n_count) on the batcher and return a Future 
+        for its readings. A cached transpiled circuit is sent as is; otherwise the built 
+        circuit is transpiled with the rest of its batch and then cached. """
+        options = self.run_options(N=N, n_count=n_count)
+        key = self.circuit_key(g=g, N=N, n_count=n_count)
+        circuit = self.circuit_cache.get(key)
+        if circuit is not None:
+            return self.batcher.submit(circuit, shots=shots, run_options=options)
+        return self.batcher.submit(
+            self.build_circuit(g=g, N=N, n_count=n_count), shots=shots, transpiled=False,
+            on_transpiled=lambda transpiled: self.circuit_cache.put(key, transpiled),
+            run_options=options
+        )
+
+    def get_transpiled_circuit(self, g: int = None, N: int = None, n_count: int = 8):
+        """ Return the QPE circuit for (g, N, n_count) transpiled for the simulator,
+        building and transpiling it only on a cache miss. """
+        from qiskit import transpile
+        key = self.circuit_key(g=g, N=N, n_count=n_count)
+        def build():
+            circuit = self.build_circuit(g=g, N=N, n_count=n_count)
+            with self.timer.span('transpile'):
+                return transpile(circuit, self.aer_sim)
+        return self.circuit_cache.get_or_build(key, build)
+
+    def quantum_phase_estimation_g_mod_n(self, g: int = None, N: int = None, n_count: int = None):
+        """ 
+        Apply quantum phase estimation to estimate the phase for some "bad" integer guess g
+        and some large number N whose factors need to be determined. 
+        We want to find the period p such that g^p = m * N + 1, or g^p mod (m * N) = 1.
+        Single-shot wrapper around sample_phases.
+        """
+        return self.sample_phases(g=g, N=N, shots=1, n_count=n_count)[0]
+
+    def sample_phases(self, g: int = None, N: int = None, shots: int = 1, n_count: int = None):
+        """ 
+        Run the QPE circuit for guess g and number N with `shots` shots and return
+        one phase phi = s / p per shot (in measurement order). Several shots of one
+        circuit cost a single build/transpile/simulate cycle, and each distinct reading
+        is another chance at a useful period.
+        n_count is the number of "counting qubits" such that we can 'count' on the
+        first n_count qubits of our circuit; by default 2*ceil(log2 N) of them 
+        (see counting_register_size). 
+        Phases are exact Fractions so wide counting registers keep every bit.
+        """
+        if n_count is None:
+            n_count = counting_register_size(N)
+        readings = self.run_readings(g=g, N=N, n_count=n_count, shots=shots)
+        if self.logger.isEnabledFor(logging.INFO):
+            self.info("Register Readings: %s", ", ".join(readings))
+
+        # Cast each register reading to an integer and divide by 2 to the power of n_count
         # to get the phase, which corresponds to the frequency obtained from the QFT as discussed
         # in the README, where the frequency is 1/p, and p is the value we want. 
-        phase = int(readings[0],2)/(2**n_count)
-        self.info("Corresponding Phase: %f" % phase)
-        return phase
+        phases = [Fraction(int(reading,2), 2**n_count) for reading in readings]
+        if self.logger.isEnabledFor(logging.INFO):
+            self.info("Corresponding Phases: %s", ", ".join("%f" % phase for phase in phases))
+        return phases
         
-    def c_amodN(self, g: int = None, p: int = None, N: int = None):
-        
-        """  
+    def run_readings(self, g: int = None, N: int = None, n_count: int = 8, shots: int = 1):
+        """ Run the QPE for (g, N, n_count) on the selected backend and return the 
+        counting register readings as bitstrings, one per shot. Safe to call from 
+        several threads at once (see QiskitShor's concurrency option). """
+        with self._calls_lock:
+            self.simulator_calls += 1
+        if self.backend == 'emulator':
+            # The NumPy emulator reproduces the circuit's reading distribution directly.
+            with self.timer.span('simulate'):
+                return self.emulator.run(g=g, N=N, n_count=n_count, shots=shots)
+        if self.backend == 'analytic':
+            # Sample the closed-form output distribution; no circuit at all.
+            with self.timer.span('simulate'):
+                return self.oracle.run(g=g, N=N, n_count=n_count, shots=shots)
+        if self.batcher is not None:
+            # Wait for the batch this circuit was grouped into to come back.
+            future = self.submit_to_batcher(g=g, N=N, n_count=n_count, shots=shots)
+            with self.timer.span('batch_wait'):
+                return future.result()
+        from qiskit import assemble
+        # Pick the simulation method (or refuse) from the qubit count and gate sizes before building anything.
+        options = self.run_options(N=N, n_count=n_count)
+        # Build (or fetch from the cache) the QPE circuit transpiled for the AER simulator,
+        # which we use to simulate results. 
+        t_circuit = self.get_transpiled_circuit(g=g, N=N, n_count=n_count)
+        # Setting memory=True below allows us to see a list of each sequential reading
+        with self.timer.span('assemble'):
+            qobj = assemble(t_circuit, shots=shots)
+        # Obtain the result from the simulation and print / display those results.
+        with self.timer.span('simulate'):
+            result = self.aer_sim.run(qobj, memory=True, **options).result()
+        return result.get_memory()
 
-        To create U^p where U is a unitary operator, we repeat the circuit p times. 
-        This is specifically written to achieve controlled multiplication by g mod N.
+    def c_amodN(self, g: int = None, p: int = 1, N: int = None):
+        """  
+        Controlled multiplication by g^p mod N as a single gate, for any odd N.
         Where: 
-        g is some "bad" integer guess between 2 and 14 inclusive, 
+        g is some "bad" integer guess coprime to N, 
         N is the number whose prime factors we want, and 
-        p is such that g^p = m * N + 1 or g^p mod m*N = 1. 
+        p is the power of U to build (U^p multiplies by g^p mod N, which is 
+        computed classically instead of repeating the circuit p times).
 
         Tying this back into the README, if we consider our input superposition of all
         possible values of the power p, we are obtaining an output superposition of all 
-        of the corresponding remainder values defined by r = g^p mod m*N, with N statically set as 15. 
+        of the corresponding remainder values defined by r = g^p mod m*N.
+
+        With multiplier='adder' the gate is Beauregard's QFT-adder circuit 
+        (qskt/multiplier.py): O(n^3) gates on the n = ceil(log2 N) work qubits and 
+        n + 2 ancillas. With 'unitary' it is the permutation matrix of the multiplication 
+        (plus the control qubit), which Aer applies directly; its size is exponential 
+        in n, which is fine at simulator scale.
         """
-        # Create a circuit with 4 registers 
-        # (a list of instructions bound to 4 registers)
-        U = QuantumCircuit(4)
-
-        ## Repeat the following execution p times to achieve U^p        
-        for _ in range(p):   
-            if g in [2,13]: 
-                # use SWAP gate (equivalent to a state swap; classical logic gate)
-                # to swap qubit 0 with qubit 1, qubit 1 with qubit 2, qubit 2 with qubit 3. 
-                U.swap(0,1)
-                U.swap(1,2)
-                U.swap(2,3)
-            if g in [7,8]:
-                # use SWAP gate (equivalent to a state swap; classical logic gate)
-                # to swap qubit 2 with qubit 3, qubit 1 with qubit 2, qubit 0 with qubit 1. 
-                U.swap(2,3)
-                U.swap(1,2)
-                U.swap(0,1)
-            if g in [4, 11]:
-                # use SWAP gate (equivalent to a state swap; classical logic gate)
-                # to swap qubit 1 with qubit 3, qubit 0 with qubit 2 
-                U.swap(1,3)
-                U.swap(0,2)
-            if g in [7,11,13]:
-                # apply Pauli-X gate on qubits 0, 1, 2, and 3
-                # this gate essentially acts like a classical bit flip.
-                # equivalent to a pi radian rotation about the X axis. 
-                for q in range(4):
-                    U.x(q)
-        # Create one gate out of this whole repeated circuit.
-        U = U.to_gate()
-        # Name it after what it is specifically doing. 
-        U.name = "%i^%i mod 15" % (g, p)
-        # Return a controlled version of the gate U with default 1 contro added to gate. 
-        c_U = U.control()
-        return c_U
\ No newline at end of file
+        a = pow(g, p, N)
+        n_work = work_register_size(N)
+        # The control is the gate's qubit 0 and the work register its qubits 1..n_work.
+        if self.multiplier == 'adder':
+            from .multiplier import controlled_multiplier
+            c_U = controlled_multiplier(a=a, N=N, num_qubits=n_work).to_gate()
+        else:
+            from qiskit.extensions import UnitaryGate
+            c_U = UnitaryGate(controlled_multiplication_matrix(a=a, N=N, num_qubits=n_work))
+        # Label it after what it is specifically doing. The name must stay 'unitary' for 
+        # the dense gate: Aer only runs instructions named 'unitary' natively, and 
+        # transpile decomposes anything else into thousands of u/cx gates.
+        c_U.label = "c-%i^%i mod %i" % (g, p, N)
+        return c_U
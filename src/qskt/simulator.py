@@ -0,0 +1,109 @@
+""" Aer simulator configuration for the QPE circuits.
+
+The QPE circuit has n_count + ceil(log2 N) qubits, and a statevector of
+n qubits takes 2^n complex amplitudes (16 bytes each in double precision,
+8 in single). A few more counting qubits are enough to push that past the
+machine's memory, at which point Aer either fails or the process is
+killed. SimulatorConfig picks the Aer options for each circuit size and
+checks the statevector estimate against a memory budget first: too-large
+circuits are switched to a fallback method (matrix_product_state by
+default, whose memory grows with entanglement rather than qubit count) or
+rejected with SimulatorMemoryError before anything is built.
+
+The circuit's dense gates count against the same budget: each controlled
+multiplication is a 2^(n_work+1) x 2^(n_work+1) complex matrix, and all
+n_count of them are built before Aer runs, whatever the method. A circuit
+whose gates alone exceed the budget is always rejected.
+"""
+import os
+
+SIMULATION_METHODS = (
+    'automatic', 'statevector', 'density_matrix', 'matrix_product_state', 'extended_stabilizer',
+)
+# methods whose memory is governed by the dense 2^n statevector estimate
+_DENSE_METHODS = ('automatic', 'statevector')
+
+
+class SimulatorMemoryError(MemoryError):
+    """ Raised instead of building a circuit whose dense gates would not fit in
+    the memory budget, or whose statevector would not fit and no fallback
+    method is configured. """
+
+
+def available_memory_mb():
+    """ Physical memory of this machine in MiB, or None if it cannot be determined. """
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1 << 20)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class SimulatorConfig:
+    def __init__(self, method: str = 'automatic', precision: str = 'double',
+                 max_parallel_threads: int = 0, max_memory_mb: int = None,
+                 fallback_method: str = 'matrix_product_state'):
+        """ method and precision ('double' or 'single') are passed to Aer as is;
+        max_parallel_threads=0 lets Aer use every core.
+        max_memory_mb is the budget for one simulation (default: half the physical
+        memory); it is also handed to Aer.
+        fallback_method replaces 'automatic'/'statevector' for circuits whose
+        statevector exceeds the budget; None refuses them instead. """
+        if method not in SIMULATION_METHODS:
+            raise ValueError(f'unknown simulation method {method!r}; choose from {SIMULATION_METHODS}')
+        if fallback_method is not None and fallback_method not in SIMULATION_METHODS:
+            raise ValueError(f'unknown fallback method {fallback_method!r}; choose from {SIMULATION_METHODS}')
+        if precision not in ('double', 'single'):
+            raise ValueError(f"precision must be 'double' or 'single', not {precision!r}")
+        self.method = method
+        self.precision = precision
+        self.max_parallel_threads = max_parallel_threads
+        if max_memory_mb is None:
+            physical = available_memory_mb()
+            max_memory_mb = physical // 2 if physical else None
+        self.max_memory_mb = max_memory_mb
+        self.fallback_method = fallback_method
+
+    def statevector_mb(self, num_qubits: int = None):
+        """ Memory of a num_qubits statevector in MiB at the configured precision. """
+        amplitude_bytes = 16 if self.precision == 'double' else 8
+        return (amplitude_bytes << num_qubits) / (1 << 20)
+
+    @staticmethod
+    def unitary_mb(num_qubits: int = None, count: int = 1):
+        """ Memory of count dense num_qubits-qubit gate matrices in MiB (complex128,
+        as NumPy builds them, whatever the simulation precision). """
+        return count * (16 << (2 * num_qubits)) / (1 << 20)
+
+    def method_for(self, num_qubits: int = None, gates_mb: float = 0.0):
+        """ Simulation method for a circuit of num_qubits whose dense gates take
+        gates_mb MiB, applying the memory guard. """
+        if self.max_memory_mb is None:
+            return self.method
+        if gates_mb > self.max_memory_mb:
+            raise SimulatorMemoryError(
+                f'the dense gates of a {num_qubits}-qubit circuit need {gates_mb:.0f} MiB, over '
+                f'the {self.max_memory_mb} MiB budget; use fewer work qubits or a larger max_memory_mb')
+        if self.method not in _DENSE_METHODS:
+            return self.method
+        required = self.statevector_mb(num_qubits) + gates_mb
+        if required <= self.max_memory_mb:
+            return self.method
+        if self.fallback_method is None:
+            raise SimulatorMemoryError(
+                f'a {num_qubits}-qubit statevector and its gates need {required:.0f} MiB, over the '
+                f'{self.max_memory_mb} MiB budget; use fewer counting qubits, a larger '
+                f'max_memory_mb or a fallback_method')
+        return self.fallback_method
+
+    def options_for(self, num_qubits: int = None, gates_mb: float = 0.0):
+        """ Aer run options for a circuit of num_qubits whose dense gates take gates_mb
+        MiB (raises SimulatorMemoryError when it cannot be built and simulated within
+        the budget). """
+        options = {
+            'method': self.method_for(num_qubits, gates_mb=gates_mb),
+            'precision': self.precision,
+            'max_parallel_threads': self.max_parallel_threads,
+        }
+        if self.max_memory_mb is not None:
+            options['max_memory_mb'] = self.max_memory_mb
+        return options
@@ -1,27 +1,223 @@
-import numpy as np  
 from math import gcd
 import time 
-from numpy.random import randint
-from fractions import Fraction
-import os 
-import numpy as np 
-from math import gcd
 import os 
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from .qpe import QuantumPhaseEstimator
+from .batcher import CircuitBatcher
+from .cache import TranspiledCircuitCache
+from .simulator import SimulatorConfig
+from .arithmetic import counting_register_size, work_register_size
 from base import Base 
+from utils.periods import candidate_periods, factors_from_period
+from utils.timing import StageTimer
+from utils.store import FactorizationStore
+from utils.guesses import GuessScheduler
 LOG_FOLDER_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'log')
 
 class QiskitShor(Base):
-    def __init__(self, name: str = 'QiskitShorSolver', verbose: bool = False):
+    def __init__(self, name: str = 'QiskitShorSolver', verbose: bool = False, 
+                 circuit_cache: TranspiledCircuitCache = None, shots: int = 1,
+                 backend: str = 'aer', seed: int = None, n_count: int = None,
+                 timings: bool = False, result_store: FactorizationStore = None,
+                 concurrency: int = 1, batcher: CircuitBatcher = None,
+                 simulator: SimulatorConfig = None, adaptive: bool = False, widen_step: int = None,
+                 qft_mode: str = 'full', min_rotation_angle: float = 0.0, multiplier: str = 'unitary'):
+        """ backend picks the QPE backend: 'aer' (Qiskit Aer simulator), 'emulator' 
+        (NumPy permutation-state emulator, no Qiskit import) or 'analytic' (fast oracle 
+        sampling the closed-form QPE distribution; for characterizing the classical retry 
+        logic at sizes no statevector can hold). The last two are seeded with seed. 
+        seed also seeds the guess scheduler (utils/guesses.py), which draws the bases g 
+        without replacement and skips bases known to fail for N; None draws a fresh sequence. 
+        n_count is the number of counting qubits; by default 2*ceil(log2 N), derived per N. 
+        adaptive=True starts each guess with ceil(log2 N) counting qubits and widens by 
+        widen_step (default ceil(log2 N) / 4, up to n_count) only while the readout is all zero or no candidate period passes g^p mod N = 1. 
+        Results report the counting widths tried for every attempt under 'counting_qubits'. 
+        shots is the number of QPE shots per circuit; every distinct reading is 
+        harvested for candidate periods, so shots > 1 usually needs one simulator call. 
+        circuit_cache is handed to the QuantumPhaseEstimator; pass e.g. 
+        TranspiledCircuitCache(cache_dir=CIRCUIT_CACHE_PATH) to persist transpiled 
+        circuits across processes. Counters are available via circuit_cache_info(). 
+        timings=True adds a 'timings' entry to each result with per-stage and 
+        per-attempt spans (see utils/timing.py). 
+        result_store (utils/store.py) is consulted before factoring N and before running 
+        the QPE for a guess; it is updated with the factors and every verified period. 
+        concurrency > 1 keeps that many guesses in flight at once and takes the first 
+        one that factors N; results then also report 'abandoned_attempts'. 
+        batcher (aer backend) groups the QPE circuits of concurrent guesses, and of other 
+        solvers sharing the same batcher, into multi-experiment Aer jobs. 
+        simulator configures the Aer method, precision, threads and memory guard, e.g. 
+        SimulatorConfig(method='statevector', precision='single', fallback_method=None). 
+        qft_mode='semiclassical' runs the QPE with one recycled control qubit instead of 
+        n_count counting qubits; min_rotation_angle > 0 uses the approximate QFT 
+        (see QuantumPhaseEstimator). multiplier='adder' builds the controlled multiplications 
+        from QFT adders instead of dense permutation gates (polynomial gate count, but 
+        n + 2 more qubits to simulate). """
         super().__init__(name, verbose)
-        self.qpe = QuantumPhaseEstimator()
-        self.name = name 
-        self.verbose = verbose
-        self.setup_logging()
+        self.timer = StageTimer(enabled=timings)
+        self.result_store = result_store
+        self.qpe = QuantumPhaseEstimator(circuit_cache=circuit_cache, backend=backend, seed=seed,
+                                         timer=self.timer, batcher=batcher, simulator=simulator,
+                                         qft_mode=qft_mode, min_rotation_angle=min_rotation_angle,
+                                         multiplier=multiplier)
+        self.shots = shots
+        self.n_count = n_count
+        self.adaptive = adaptive
+        self.widen_step = widen_step
+        self.concurrency = concurrency
+        self.guesses = GuessScheduler(seed=seed)
+
+    def circuit_cache_info(self):
+        """ Hit/miss counters of the transpiled circuit cache used by the QPE """
+        return self.qpe.circuit_cache.info()
 
     def _g_is_nontrivial_factor_of_n(self, g: int = None, n: int = None):
         return g not in [1,n] and (n % g) == 0
 
+    def counting_widths(self, N: int = None):
+        """ Counting register widths to try for one guess, narrowest first. """
+        full = self.n_count if self.n_count is not None else counting_register_size(N)
+        if not self.adaptive:
+            return [full]
+        step = self.widen_step or max(1, work_register_size(N) // 4)
+        return list(range(min(work_register_size(N), full), full, step)) + [full]
+
+    def attempt_guess(self, g: int = None, N: int = None, widths_used: list = None,
+                      qpe: QuantumPhaseEstimator = None, cancel: threading.Event = None):
+        """ Try to factor N from one guess g coprime to N: find candidate periods 
+        (from the result store or the QPE) and return the factors from the first 
+        candidate that gives a proper split, or None if this guess failed. 
+        The counting widths used are appended to widths_used. 
+        qpe defaults to self.qpe (factor_concurrently passes a per-attempt copy); 
+        once cancel is set the attempt gives up between stages and returns None. """
+        widths_used = widths_used if widths_used is not None else []
+        qpe = qpe if qpe is not None else self.qpe
+        stored_period = self.result_store.get_period(g, N) if self.result_store is not None else None
+        if stored_period is not None:
+            self.info('Using stored period p = %s for g = %s', stored_period, g)
+            candidates = [stored_period]
+        else:
+            widths = self.counting_widths(N)
+            for n_count in widths:
+                if cancel is not None and cancel.is_set():
+                    return None
+                widths_used.append(n_count)
+                # find a guess for the period p such that g^p mod m*N = 1 
+                self.info('Getting phases phi = s / p from initial guess g = %s in order to find period p (n_count=%s)', g, n_count)
+                phases = qpe.sample_phases(
+                    g=g, 
+                    N=N,
+                    shots=self.shots,
+                    n_count=n_count
+                ) # returns one phase phi = s / p per shot such that we can find p 
+                if not any(phase != 0 for phase in phases):
+                    if n_count < widths[-1]:
+                        # s = 0 readings (or too few bits to resolve s/p) say nothing about p yet
+                        self.info('phases are all 0 with n_count=%s; widening the counting register', n_count)
+                        continue
+                    self.info('phases returned from Quantum Phase Estimation are all 0. Re-attempting factorization.')
+                    self.guesses.record_failure(g, N)
+                    return None
+                # The denominators should tell us the period (i.e. the frequency from 
+                # the quantum fourier transform should tell us the period p of the superposition
+                # obtained from measuring a result from the superposition of remainder values)
+                # this is discussed in greater detail in the README. Each distinct reading gives a 
+                # candidate, and LCMs of candidates recover p when a reading had gcd(s, p) > 1.
+                if cancel is not None and cancel.is_set():
+                    return None
+                with qpe.timer.span('postprocess'):
+                    candidates = candidate_periods(phases=phases, N=N)
+                self.info('Phases = %s. Candidate periods p = %s', phases, candidates)
+                # widen the counting register only when the precision was too low for 
+                # any candidate to be a multiple of the period
+                if n_count == widths[-1] or any(pow(g, p, N) == 1 for p in candidates):
+                    break
+                self.info('No candidate passed g^p mod N = 1 with n_count=%s; widening the counting register', n_count)
+        # cheap check that g^p mod N = 1 before doing any gcd work
+        verified = [p for p in candidates if pow(g, p, N) == 1]
+        for p in candidates:
+            if p not in verified:
+                self.info('g^p mod N = %s^%s mod %s != 1, discarding candidate p = %s', g, p, N, p)
+        # the smallest verified candidate is the best known period (the others include 
+        # LCM multiples of it); store only that one, once per guess
+        verified_period = min(verified) if verified else None
+        if self.result_store is not None and stored_period is None and verified_period is not None:
+            self.result_store.put_period(g, N, verified_period)
+        for p in verified:
+            self.info('g^p mod m * N = 1 => %s^%s mod m*%s = 1, implies: ', g, p, N)
+            self.info('(g^p - 1) mod N = (%s^%s - 1) mod %s = 0', g, p, N)
+            if p % 2 != 0: 
+                self.info('Period p = %s is not even. Trying the next candidate.', p)
+                continue
+            # if the period p is also even we can continue 
+            self.info('p = %s is even, continuing...', p)
+            self.info('g^p - 1 = %s^%s - 1 = a * b = (g ^(p/2) - 1) * ((g ^ (p/2)) + 1) = (%s ^(%s/2) - 1) * ((%s ^ (%s/2)) + 1) ', g, p, g, p, g, p)
+            self.info('There is a high probability that the GCD of N=%s and either a=(g ^(p/2) - 1) or b=((g ^ (p/2)) + 1) is a proper factor of N', N)
+            # g^(p/2) is only ever computed mod N 
+            with qpe.timer.span('postprocess'):
+                factors = factors_from_period(g=g, r=p, N=N)
+            if factors is not None:
+                return factors
+        self.info('No candidate period gave a proper factor. Re-attempting factorization.')
+        self.guesses.record_failure(g, N, period=verified_period)
+        return None
+
+    def _attempt_guess_in_thread(self, g: int = None, N: int = None,
+                                 qpe: QuantumPhaseEstimator = None, cancel: threading.Event = None):
+        qpe.timer.start_attempt()
+        widths_used = []
+        return self.attempt_guess(g=g, N=N, widths_used=widths_used, qpe=qpe, cancel=cancel), widths_used
+
+    def _merge_attempt(self, qpe: QuantumPhaseEstimator = None):
+        """ Fold the timings and simulator calls of one checked attempt into the solver's. """
+        self.timer.merge(qpe.timer)
+        with self.qpe._calls_lock:
+            self.qpe.simulator_calls += qpe.simulator_calls
+
+    def factor_concurrently(self, N: int = None):
+        """ Keep self.concurrency guesses in flight on a thread pool (the simulator 
+        releases the GIL while it runs) and return (factors, attempts, abandoned) as 
+        soon as any guess splits N, plus the counting widths of every checked attempt. 
+        attempts counts the guesses that finished and 
+        were checked, including the winner; abandoned counts the guesses still 
+        queued or running at that point, which are cancelled or told to stop at 
+        their next stage with their result ignored. 
+        Every attempt runs on its own QuantumPhaseEstimator copy (own timer, simulator 
+        call counter and spawned RNG, see QuantumPhaseEstimator.for_attempt); only the 
+        checked attempts are merged into self.timer and self.qpe.simulator_calls, so 
+        abandoned attempts still running never leak into this or the next result. """
+        attempts = 0
+        counting_qubits = []
+        in_flight = {}
+        cancel = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=self.name)
+        try:
+            while True:
+                while len(in_flight) < self.concurrency:
+                    g = self.guesses.next_guess(N)
+                    self.info('Submitting guess g=%s (%s in flight)', g, len(in_flight))
+                    _gcd = gcd(g, N)
+                    if _gcd != 1:
+                        counting_qubits.append([])
+                        return {'p': _gcd, 'q': N // _gcd}, attempts + 1, len(in_flight), counting_qubits
+                    qpe = self.qpe.for_attempt()
+                    future = executor.submit(self._attempt_guess_in_thread, g, N, qpe, cancel)
+                    in_flight[future] = (g, qpe)
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    g, qpe = in_flight.pop(future)
+                    attempts += 1
+                    factors, widths_used = future.result()
+                    self._merge_attempt(qpe)
+                    counting_qubits.append(widths_used)
+                    if factors is not None:
+                        self.info('Attempt=%s; guess g=%s won, abandoning %s in flight', 
+                                  attempts, g, len(in_flight))
+                        return factors, attempts, len(in_flight), counting_qubits
+        finally:
+            cancel.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def factor(self, N): 
         """ Run shors algorithm to leverage quantum computing 
         to find prime factors of large number N.
@@ -30,11 +226,27 @@ class QiskitShor(Base):
         Also, the period p such that the guess ^ p mod m * N = 1 must be even.
         When these criteria are not met, the process must be restarted with a new initial 
         guess g. The reasoning behind these criteria is outlined in the README of this folder. 
+        With concurrency > 1 the guesses are tried in parallel (see factor_concurrently).
         """
         attempts = 0
+        abandoned = 0
+        counting_qubits = []  # counting register widths tried, per attempt
+        simulator_calls = self.qpe.simulator_calls
         factor_found = False 
         factors = None 
         start = time.time()
+        self.timer.reset()
+        if self.result_store is not None:
+            stored = self.result_store.get(N)
+            if stored is not None:
+                return {
+                    'attempts': stored['attempts'],
+                    'elapsed_seconds': round(time.time() - start, 6),
+                    'factors': stored['factors'],
+                    'N': N,
+                    'simulator_calls': 0,
+                    'cached': True
+                }
         if N % 2 == 0: # handle even N
             attempts = 1
             factors = {'p': 2, 'q': N // 2}
@@ -42,11 +254,17 @@ class QiskitShor(Base):
             end = time.time() 
             elapsed = round(end - start, 6)
         
-        np.random.seed(1) # seed random number generator 
+        self.guesses.start(N) # draw bases without replacement for this N 
+        if not factor_found and self.concurrency > 1:
+            factors, attempts, abandoned, counting_qubits = self.factor_concurrently(N=N)
+            factor_found = True
+            elapsed = round(time.time() - start, 6)
         while not factor_found: # continue until factor found 
             attempts += 1
-            g = randint(2, N)  # 2 inclusive to N exclusive 
-            self.info(f'Attempt={attempts}; guessed g={g}')
+            self.timer.start_attempt()
+            g = self.guesses.next_guess(N)
+            self.info('Attempt=%s; guessed g=%s', attempts, g)
+            counting_qubits.append([])
             _gcd = gcd(g, N)
             if _gcd != 1: 
                 factors = {'p': _gcd, 'q': N // _gcd}
@@ -54,46 +272,24 @@ class QiskitShor(Base):
                 end = time.time() 
                 elapsed = round(end - start, 6)
                 break 
-            # find a guess for the period p such that g^p mod m*N = 1 
-            self.info(f'Getting phase phi = s / p from initial guess g = {g} in order to find period p')
-            phase = self.qpe.quantum_phase_estimation_g_mod_n(
-                g=g, 
-                N=N
-            ) # returns a phase phi = s / p such that we can find p 
-            if phase != 0:
-                self.info(f'Phase = {phase}. Denominator should tell us the period p. ')
-                # The denominator should tell us the period (i.e. the frequency from 
-                # the quantum fourier transform should tell us the period p of the superposition
-                # obtained from measuring a result from the superposition of remainder values)
-                # this is discussed in greater detail in the README.
-                frac = Fraction(phase).limit_denominator(max_denominator=N) 
-                s, p = frac.numerator, frac.denominator 
-                self.info(f'The period p = {p}')
-                self.info(f'g^p mod m * N = 1 => {g}^{p} mod m*{N} = 1, implies: ')
-                self.info(f'(g^p - 1) mod N = ({g}^{p} - 1) mod {N} = 0')
-                
-                if p % 2 == 0: 
-                    # if the period p is also even we can continue 
-                    self.info(f'p = {p} is even, continuing...')
-                    self.info(f'g^p - 1 = {g}^{p} - 1 = a * b = (g ^(p/2) - 1) * ((g ^ (p/2)) + 1) = ({g} ^({p}/2) - 1) * (({g} ^ ({p}/2)) + 1) ')
-                    self.info(f'There is a high probability that the GCD of N={N} and either a=(g ^(p/2) - 1) or b=((g ^ (p/2)) + 1) is a proper factor of N')
-
-                    guesses = [gcd(g**(p//2)-1, N), gcd(g**(p//2)+1, N)]
-                    for guess in guesses:
-                        if self._g_is_nontrivial_factor_of_n(g=guess, n=N):  
-                            factors = {'p': guess, 'q': N // guess}
-                            factor_found = True
-                            end = time.time() 
-                            elapsed = round(end - start, 6)
-                            break 
-                else: 
-                    self.info(f'Period p = {p} is not even. Re-attempting factorization.')
-            else: 
-                self.info(f'phase returned from Quantum Phase Estimation is 0. Re-attempting factorization.')
-        return {
+            factors = self.attempt_guess(g=g, N=N, widths_used=counting_qubits[-1])
+            if factors is not None:
+                factor_found = True
+                end = time.time() 
+                elapsed = round(end - start, 6)
+        result = {
             'attempts': attempts,
             'elapsed_seconds': elapsed,
             'factors': factors,
-            'N': N
+            'N': N,
+            'simulator_calls': self.qpe.simulator_calls - simulator_calls,
+            'counting_qubits': counting_qubits
         }
+        if self.concurrency > 1:
+            result['abandoned_attempts'] = abandoned
+        if self.timer.enabled:
+            result['timings'] = self.timer.report()
+        if self.result_store is not None:
+            self.result_store.put(result)
+        return result
       
\ No newline at end of file
@@ -0,0 +1,32 @@
+""" Solvers by name, for the command line tools (cli.py, bench/suite.py).
+
+Solver modules are imported only when their solver is asked for, so using
+the classical solvers never imports Qiskit.
+"""
+
+SOLVER_NAMES = ('classical', 'dispatcher', 'qiskit', 'emulator', 'analytic')
+
+
+def solver_spec(name: str = 'classical', verbose: bool = False, seed: int = None, **options):
+    """ (solver class, constructor kwargs) for a solver name. Kept separate from
+    build_solver so a process pool can construct the solver inside each worker
+    (see utils/batch.init_worker, which gives every worker its own seed derived
+    from seed). Extra options are passed to the constructor. """
+    if name == 'classical':
+        from classical.solver import ClassicalPrimeFactorization
+        return ClassicalPrimeFactorization, {'verbose': verbose, 'seed': seed, **options}
+    if name == 'dispatcher':
+        from classical.dispatcher import ClassicalFactoringDispatcher
+        return ClassicalFactoringDispatcher, {'verbose': verbose, **options}
+    if name in ('qiskit', 'emulator', 'analytic'):
+        from qskt.solver import QiskitShor
+        backend = 'aer' if name == 'qiskit' else name
+        return QiskitShor, {'name': f'QiskitShor-{backend}', 'verbose': verbose,
+                            'backend': backend, 'seed': seed, **options}
+    raise ValueError(f'unknown solver {name!r}; choose from {SOLVER_NAMES}')
+
+
+def build_solver(name: str = 'classical', verbose: bool = False, seed: int = None, **options):
+    """ Construct a solver by name. """
+    solver_cls, solver_kwargs = solver_spec(name, verbose=verbose, seed=seed, **options)
+    return solver_cls(**solver_kwargs)
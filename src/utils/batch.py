@@ -0,0 +1,98 @@
+""" Worker-side helpers for factoring batches of semiprimes in a process
+pool (see Driver.factor_many in main.py).
+
+Each worker process builds its solver exactly once in init_worker, so the
+solver module (and Qiskit, for the quantum solver) is imported and set up
+once per worker instead of once per semiprime. Work then arrives in chunks
+of (index, N) pairs to keep inter-process overhead low. Workers number
+themselves through a shared counter and seed their solver with worker_seed,
+so a seeded run is reproducible without every worker drawing the same guesses.
+"""
+import multiprocessing
+import signal
+
+# the solver instance owned by this worker process
+_worker_solver = None
+
+
+class FactoringTimeout(Exception):
+    """ Raised inside a worker when a single factor() call exceeds its
+    per-item time budget. """
+
+
+def _raise_timeout(signum, frame):
+    raise FactoringTimeout()
+
+
+def worker_seed(seed: int = None, index: int = 0):
+    """ Seed for worker number index: the index-th child of SeedSequence(seed), so
+    workers get independent streams. None stays None (fresh entropy everywhere). """
+    if seed is None:
+        return None
+    import numpy as np
+    return int(np.random.SeedSequence(seed, spawn_key=(index,)).generate_state(1, np.uint64)[0])
+
+
+def worker_initargs(solver_cls=None, solver_kwargs: dict = None):
+    """ initargs for a pool using init_worker: the solver spec plus a fresh worker counter. """
+    return solver_cls, solver_kwargs or {}, multiprocessing.Value('i', 0)
+
+
+def init_worker(solver_cls=None, solver_kwargs: dict = None, worker_counter=None):
+    """ ProcessPoolExecutor initializer: warm up the worker by importing and
+    constructing the solver once. With worker_counter (see worker_initargs) the
+    worker takes the next number from it and replaces a 'seed' in solver_kwargs
+    by worker_seed(seed, number). """
+    global _worker_solver
+    solver_kwargs = dict(solver_kwargs or {})
+    if worker_counter is not None:
+        with worker_counter.get_lock():
+            index = worker_counter.value
+            worker_counter.value += 1
+        if solver_kwargs.get('seed') is not None:
+            solver_kwargs['seed'] = worker_seed(solver_kwargs['seed'], index)
+    _worker_solver = solver_cls(**solver_kwargs)
+
+
+def timed_out_result(N: int = None, timeout: float = None):
+    """ Result dict reported for an item that hit its per-item timeout. """
+    return {
+        'N': N,
+        'factors': None,
+        'elapsed_seconds': timeout,
+        'attempts': None,
+        'timed_out': True
+    }
+
+
+def factor_with_timeout(solver=None, N: int = None, timeout: float = None):
+    """ Run solver.factor(N), giving up after `timeout` seconds.
+    Uses SIGALRM, so the timeout is only enforced in the main thread of a
+    process on platforms that support setitimer (always true for pool
+    workers on Linux); elsewhere the call simply runs to completion. """
+    if not timeout or not hasattr(signal, 'setitimer'):
+        return solver.factor(N)
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return solver.factor(N)
+    except FactoringTimeout:
+        return timed_out_result(N=N, timeout=timeout)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def factor_chunk(chunk: list = None, timeout: float = None):
+    """ Factor a chunk of (index, N) pairs with this worker's solver and
+    return a list of (index, result) pairs. """
+    return [
+        (index, factor_with_timeout(solver=_worker_solver, N=N, timeout=timeout))
+        for index, N in chunk
+    ]
+
+
+def chunked(items: list = None, chunksize: int = 1):
+    """ Split items into (index, item) chunks of at most chunksize. """
+    indexed = list(enumerate(items))
+    return [indexed[i:i + chunksize] for i in range(0, len(indexed), chunksize)]
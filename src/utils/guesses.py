@@ -0,0 +1,125 @@
+""" Guess (base) selection for the order-finding solvers.
+
+Drawing g uniformly at random wastes order findings -- simulator calls for
+QiskitShor -- on bases that cannot split N. A GuessScheduler draws bases
+without replacement from its own seeded random.Random and remembers, per N,
+the bases that failed, together with what the failure implies:
+
+* if g has odd order r, every power of g also has odd order, and
+  (-g)^r = -1 mod N, so -g and its odd powers fail too;
+* if g^(r/2) = -1 mod N, every odd power g^k also has (g^k)^(r'/2) = -1
+  for its order r', so the odd powers of g fail.
+
+Among fresh bases it prefers those with Jacobi symbol (g/N) = -1. For
+N = p*q such a g is a non-residue modulo exactly one of p and q, so the
+2-adic valuations of its orders modulo p and q usually differ, which is the
+condition for an even order with g^(r/2) != -1. When p - 1 and q - 1 have the
+same 2-adic valuation (e.g. p = q = 3 mod 4) every such base splits N.
+"""
+import random
+import threading
+from collections import OrderedDict
+from math import gcd
+from utils.primes import jacobi
+
+
+class _ModulusState:
+    __slots__ = ('tried', 'bad')
+
+    def __init__(self):
+        self.tried = set()  # bases handed out in the current factorization
+        self.bad = set()  # bases known to fail for this N, kept across factorizations
+
+
+class GuessScheduler:
+    def __init__(self, seed: int = None, prefer_jacobi: bool = True, jacobi_draws: int = 8,
+                 max_marked_powers: int = 64, max_moduli: int = 1024):
+        """ seed seeds this scheduler's own random.Random (None: nondeterministic).
+        prefer_jacobi draws up to jacobi_draws fresh bases per guess and returns the
+        first with Jacobi symbol -1 (or a common factor), else the first drawn.
+        max_marked_powers bounds how many powers of a failed base are marked bad.
+        Failed bases are remembered for the max_moduli most recently used N. """
+        self.rng = random.Random(seed)
+        self.prefer_jacobi = prefer_jacobi
+        self.jacobi_draws = jacobi_draws
+        self.max_marked_powers = max_marked_powers
+        self.max_moduli = max_moduli
+        self._moduli = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _state(self, N: int = None):
+        state = self._moduli.get(N)
+        if state is None:
+            state = self._moduli[N] = _ModulusState()
+            if len(self._moduli) > self.max_moduli:
+                self._moduli.popitem(last=False)
+        else:
+            self._moduli.move_to_end(N)
+        return state
+
+    def start(self, N: int = None):
+        """ Begin a new factorization of N: every base not known to be bad may be drawn again. """
+        with self._lock:
+            self._state(N).tried.clear()
+
+    def next_guess(self, N: int = None):
+        """ A base g in [2, N - 2] not yet drawn in this factorization of N and not
+        known to be bad. 1 and N - 1 = -1 are never drawn: they have order 1 and 2
+        with g^(r/2) = -1. Once every base is used up the memory for N starts over. """
+        with self._lock:
+            state = self._state(N)
+            if len(state.tried | state.bad) >= N - 3:
+                state.tried.clear()
+                state.bad.clear()
+            prefer = self.prefer_jacobi and N % 2 == 1
+            draws_left, fallback = self.jacobi_draws, None
+            while True:
+                g = self.rng.randrange(2, N - 1)
+                if g in state.tried or g in state.bad:
+                    continue
+                if not prefer or gcd(g, N) != 1 or jacobi(g, N) == -1:
+                    break
+                if fallback is None:
+                    fallback = g
+                draws_left -= 1
+                if draws_left <= 0:
+                    g = fallback
+                    break
+            state.tried.add(g)
+            return g
+
+    def record_failure(self, g: int = None, N: int = None, period: int = None):
+        """ Remember that g did not split N. period, if known, is a verified period of g
+        (g^period = 1 mod N); it lets the powers of g (and of -g) that must fail the
+        same way be skipped as well. """
+        with self._lock:
+            state = self._state(N)
+            state.bad.add(g)
+            if period is None:
+                return
+            if period % 2 == 1:
+                # odd order: every power of g fails, and -g has (-g)^r = -1
+                self._mark_powers(state, g, N, step=1)
+                self._mark_powers(state, N - g, N, step=2)
+            elif pow(g, period // 2, N) == N - 1:
+                # the 2-adic part of the order is exact, so odd powers keep g^(r/2) = -1
+                self._mark_powers(state, g, N, step=2)
+
+    def _mark_powers(self, state: _ModulusState = None, g: int = None, N: int = None, step: int = 1):
+        """ Mark g, g^(1+step), g^(1+2*step), ... as bad, up to max_marked_powers. """
+        multiplier = pow(g, step, N)
+        power = g
+        for _ in range(self.max_marked_powers):
+            if 1 < power < N - 1:
+                state.bad.add(power)
+            power = power * multiplier % N
+            if power == g:
+                break
+
+    def info(self, N: int = None):
+        """ Counters for N: bases drawn in the current factorization and bases known to be bad. """
+        with self._lock:
+            state = self._moduli.get(N)
+            if state is None:
+                return {'tried': 0, 'bad': 0}
+            return {'tried': len(state.tried), 'bad': len(state.bad)}
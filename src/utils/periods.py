@@ -0,0 +1,52 @@
+""" Shared post-processing that turns the period (order) r of some guess g
+modulo N into a pair of factors of N. Both the classical and the quantum
+solvers end up in the same place once they have r, so the number theory
+lives here rather than being repeated in each solver.
+"""
+from fractions import Fraction
+from math import gcd, lcm
+
+
+def factors_from_period(g: int = None, r: int = None, N: int = None):
+    """ Given the period r such that g^r mod N = 1, return a dict
+    {'p': p, 'q': q} of non-trivial factors of N, or None if r cannot be used
+    (r is odd, or g^(r/2) = -1 mod N so the guesses are trivial).
+
+    g^(r/2) is computed with exact modular exponentiation (pow(g, r // 2, N))
+    so neither a float nor a full size big integer is ever built.
+    """
+    if r is None or r % 2 != 0:
+        return None
+    x = pow(g, r // 2, N)
+    if (x + 1) % N == 0:
+        return None
+    for guess in (gcd(x + 1, N), gcd(x - 1, N)):
+        if guess not in (1, N):
+            return {'p': guess, 'q': N // guess}
+    return None
+
+
+def candidate_periods(phases: list = None, N: int = None):
+    """ Harvest candidate periods from a list of measured phases s/r.
+
+    Every distinct non-zero reading gives a candidate denominator through
+    Fraction.limit_denominator(N). A reading only reveals r / gcd(s, r), so
+    LCMs of pairs of candidate denominators (and of all of them) are added
+    too, as long as they stay below N. Candidates are returned smallest first;
+    callers should confirm each one with pow(g, r, N) == 1 before gcd work.
+    """
+    denominators = sorted({
+        Fraction(phase).limit_denominator(max_denominator=N).denominator
+        for phase in set(phases) if phase != 0
+    })
+    candidates = set(d for d in denominators if d > 1)
+    for i, a in enumerate(denominators):
+        for b in denominators[i + 1:]:
+            multiple = lcm(a, b)
+            if multiple < N:
+                candidates.add(multiple)
+    if denominators:
+        multiple = lcm(*denominators)
+        if multiple < N:
+            candidates.add(multiple)
+    return sorted(candidates)
@@ -0,0 +1,78 @@
+""" Small prime helpers shared by the classical factoring engines:
+a cached table of small primes and a deterministic Miller-Rabin test.
+"""
+from bisect import bisect_right
+
+# module-level cache of all primes below _table_limit. The table only ever
+# grows (doubling), so repeated calls with similar limits reuse one sieve.
+_table = []
+_table_limit = 0
+
+
+def _sieve(limit: int = 2):
+    """ Plain Sieve of Eratosthenes over a bytearray; returns primes < limit. """
+    if limit < 3:
+        return []
+    flags = bytearray([1]) * limit
+    flags[0] = flags[1] = 0
+    for i in range(2, int(limit ** 0.5) + 1):
+        if flags[i]:
+            flags[i * i::i] = bytearray(len(range(i * i, limit, i)))
+    return [i for i, is_prime in enumerate(flags) if is_prime]
+
+
+def small_primes(limit: int = 1000):
+    """ Return the list of all primes below limit from the cached table. """
+    global _table, _table_limit
+    if limit > _table_limit:
+        new_limit = max(limit, 2 * _table_limit, 1 << 12)
+        _table = _sieve(new_limit)
+        _table_limit = new_limit
+    return _table[:bisect_right(_table, limit - 1)]
+
+
+# deterministic Miller-Rabin witnesses for n < 3.3 * 10^24
+_MR_WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+
+def is_probable_prime(n: int = None):
+    """ Miller-Rabin primality test. Deterministic for n < 3.3e24 and a
+    very strong probable-prime test beyond that. """
+    if n < 2:
+        return False
+    for p in _MR_WITNESSES:
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for a in _MR_WITNESSES:
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = (x * x) % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def jacobi(a: int = None, n: int = None):
+    """ Jacobi symbol (a/n) for odd n > 0: 1, -1, or 0 when gcd(a, n) > 1. """
+    if n <= 0 or n % 2 == 0:
+        raise ValueError(f'the Jacobi symbol needs an odd positive n, not {n}')
+    a %= n
+    result = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
@@ -1,40 +1,167 @@
-import itertools 
-import random 
+import itertools
+import random
+from math import isqrt
+import numpy as np
 from base import Base
+from utils.primes import is_probable_prime
+
+# Memoized prime table shared by every SemiPrimeGenerator in the process:
+# all primes below _prime_table_bound, as a sorted NumPy array. It only ever
+# grows, up to MAX_TABLE_BOUND, so repeated calls with the same (or a smaller)
+# bound never re-sieve.
+_prime_table = np.array([], dtype=np.uint64)
+_prime_table_bound = 0
+
+# Bounds above this are not tabulated (1e9 would need ~200MB of primes):
+# prime_table sieves the range above it segment by segment without keeping it,
+# and sample_primes samples by rejection with Miller-Rabin instead.
+MAX_TABLE_BOUND = 1 << 27
+
+
+def _simple_sieve(upper_bound: int = 2):
+    """ Boolean NumPy sieve: is_prime[i] for 0 <= i < upper_bound """
+    is_prime = np.ones(max(upper_bound, 2), dtype=bool)
+    is_prime[:2] = False
+    for i in range(2, isqrt(upper_bound - 1) + 1):
+        if is_prime[i]:
+            is_prime[i * i::i] = False
+    return is_prime[:upper_bound]
+
+
+def prime_segments(low: int = 2, high: int = 1000, segment_size: int = 1 << 20):
+    """ Yield the primes in [low, high) as sorted NumPy arrays, one per segment.
+    Only odd numbers are sieved, one segment of `segment_size` odd numbers at a
+    time using the base primes up to sqrt(high), so working memory stays at one
+    small flag array regardless of the bound. """
+    if high <= 2 or low >= high:
+        return
+    if low <= 2:
+        yield np.array([2], dtype=np.uint64)
+        low = 3
+    low |= 1  # segments start on an odd number
+    base_primes = np.nonzero(_simple_sieve(isqrt(high - 1) + 1))[0][1:]  # odd base primes
+    for segment_low in range(low, high, 2 * segment_size):
+        segment_high = min(segment_low + 2 * segment_size, high)
+        # flags[i] stands for the odd number segment_low + 2*i
+        flags = np.ones((segment_high - segment_low + 1) // 2, dtype=bool)
+        for p in base_primes:
+            p = int(p)
+            if p * p >= segment_high:
+                break
+            start = max(p * p, -(-segment_low // p) * p)
+            if start % 2 == 0:
+                start += p
+            flags[(start - segment_low) // 2::p] = False
+        yield segment_low + 2 * np.nonzero(flags)[0].astype(np.uint64)
+
+
+def segmented_sieve(upper_bound: int = 1000, segment_size: int = 1 << 20):
+    """ Return a NumPy array of all primes below upper_bound (see prime_segments). """
+    return np.concatenate([np.array([], dtype=np.uint64)]
+                          + list(prime_segments(2, upper_bound, segment_size)))
+
+
+def prime_table(upper_bound: int = 1000):
+    """ Return all primes below upper_bound from the memoized table, growing
+    (at least doubling) the table when the bound exceeds it. The table never
+    grows past MAX_TABLE_BOUND; primes above it are sieved segment by segment
+    for this call only. """
+    global _prime_table, _prime_table_bound
+    bound = min(upper_bound, MAX_TABLE_BOUND)
+    if bound > _prime_table_bound:
+        new_bound = min(max(bound, 2 * _prime_table_bound), MAX_TABLE_BOUND)
+        _prime_table = segmented_sieve(new_bound)
+        _prime_table_bound = new_bound
+    table = _prime_table[:np.searchsorted(_prime_table, bound)]
+    if upper_bound <= MAX_TABLE_BOUND:
+        return table
+    return np.concatenate([table] + list(prime_segments(MAX_TABLE_BOUND, upper_bound)))
+
 
 class SemiPrimeGenerator(Base):
-    def __init__(self, name: str = 'SemiPrimeGenerator', verbose: bool = False):
+    def __init__(self, name: str = 'SemiPrimeGenerator', verbose: bool = False, seed: int = None):
         super().__init__(name, verbose)
+        self.rng = np.random.default_rng(seed)
+        self.random = random.Random(seed)
 
-    """ Class for generating list of semiprimes that can be used for testing 
+    """ Class for generating list of semiprimes that can be used for testing
     factoring algorithms in this project """
     def get_primes_sieve(self, upper_bound: int = 1000):
-        """ Return a list of all primes up to upper_bound - 1.
-        Reference: https://github.com/qiskit-community/qiskit-community-tutorials/blob/master/algorithms/shor_algorithm.ipynb
-        """
-        return list(itertools.takewhile(lambda p: p < upper_bound, self.sieve()))
+        """ Return a list of all primes up to upper_bound - 1, from the memoized
+        segmented sieve (see prime_table). """
+        return prime_table(upper_bound).tolist()
+
+    def sample_primes(self, low: int = 2, high: int = 1000, size: int = 1):
+        """ Sample `size` primes uniformly (with replacement) from [low, high) as a
+        NumPy array. Uses the memoized table when high is small enough to tabulate,
+        and rejection sampling with a Miller-Rabin test (object array of Python ints)
+        above that. """
+        if high <= MAX_TABLE_BOUND:
+            table = prime_table(high)
+            table = table[np.searchsorted(table, low):]
+            if len(table) == 0:
+                raise ValueError(f'no primes in [{low}, {high})')
+            return table[self.rng.integers(0, len(table), size=size)]
+        primes = []
+        while len(primes) < size:
+            candidate = self.random.randrange(low, high) | 1
+            if candidate < high and is_probable_prime(candidate):
+                primes.append(candidate)
+        return np.array(primes, dtype=object)
 
-    def get_n_semiprimes(self, num_semiprimes: int = 20, upper_bound: int = 1000):
-        primes = self.get_primes_sieve(upper_bound=upper_bound)
-        l = len(primes)
-        semiprimes = [self.get_semiprime(upper_bound=upper_bound) \
-            for _ in range(num_semiprimes)]
+    def get_n_semiprimes(self, num_semiprimes: int = 20, upper_bound: int = 1000,
+                         distinct: bool = False, exclude_squares: bool = False,
+                         bits: int = None):
+        """ Return num_semiprimes semiprimes p*q with primes 2 <= p,q < upper_bound.
+        distinct: no semiprime appears twice in the result.
+        exclude_squares: skip p == q.
+        bits: instead of upper_bound, draw balanced p and q of about bits/2 bits each
+              so that every semiprime has exactly `bits` bits.
+        Primes are drawn in bulk and products are formed and filtered as arrays. """
+        if bits is not None:
+            low, high = 1 << ((bits - 1) // 2), 1 << ((bits + 1) // 2)
+        else:
+            low, high = 2, upper_bound
+        semiprimes, seen = [], set()
+        stalled_rounds = 0
+        while len(semiprimes) < num_semiprimes:
+            if stalled_rounds > 100:
+                raise ValueError(
+                    f'only found {len(semiprimes)} of {num_semiprimes} semiprimes matching '
+                    f'upper_bound={upper_bound}, bits={bits}, distinct={distinct}, '
+                    f'exclude_squares={exclude_squares}')
+            found = len(semiprimes)
+            # oversample a little so filtering rarely needs another round
+            size = num_semiprimes - len(semiprimes)
+            size += size // 4 + 8
+            ps = self.sample_primes(low=low, high=high, size=size)
+            qs = self.sample_primes(low=low, high=high, size=size)
+            ns = ps * qs
+            keep = np.ones(size, dtype=bool)
+            if exclude_squares:
+                keep &= ps != qs
+            if bits is not None:
+                keep &= (ns >= (1 << (bits - 1))) & (ns < (1 << bits))
+            for n in ns[keep].tolist():
+                if distinct:
+                    if n in seen:
+                        continue
+                    seen.add(n)
+                semiprimes.append(n)
+                if len(semiprimes) == num_semiprimes:
+                    break
+            stalled_rounds = stalled_rounds + 1 if len(semiprimes) == found else 0
         return semiprimes
 
     def get_semiprime(self, upper_bound: int = 1000):
-        """ Return a semiprime that is a product of exactly two prime numbers 
+        """ Return a semiprime that is a product of exactly two prime numbers
         p and q where 2 <= p,q < upper_bound.
         Reference: https://github.com/qiskit-community/qiskit-community-tutorials/blob/master/algorithms/shor_algorithm.ipynb
         """
-        primes = self.get_primes_sieve(upper_bound=upper_bound)
-        l = len(primes)
-        # choose two random primes and return their product (a semiprime)
-        p = primes[random.randrange(l)]
-        q = primes[random.randrange(l)]
-        return p*q
-     
+        return self.get_n_semiprimes(num_semiprimes=1, upper_bound=upper_bound)[0]
+
     def sieve(self):
-        """ Sieve of Eratosthenes algorithm 
+        """ Sieve of Eratosthenes algorithm
         Reference: https://github.com/qiskit-community/qiskit-community-tutorials/blob/master/algorithms/shor_algorithm.ipynb
         """
         d = {}
@@ -0,0 +1,147 @@
+""" Store of factorization results keyed by N.
+
+Benchmark repetitions, regression corpora and SemiPrimeGenerator output
+keep asking for the same moduli. The store remembers, per N, the factors
+and the number of attempts it took, and per (N, g) the period found for
+guess g, so a repeated N is answered from memory and a repeated guess
+skips order finding / QPE.
+
+Lookups go to a bounded in-memory LRU first and then, when a path is
+given, to a SQLite database that persists across processes.
+"""
+import os
+import sqlite3
+from collections import OrderedDict
+from threading import Lock
+
+RESULT_STORE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'cache', 'results.sqlite')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS factorizations (N TEXT PRIMARY KEY, p TEXT, q TEXT, attempts INTEGER);
+CREATE TABLE IF NOT EXISTS periods (N TEXT, g TEXT, r TEXT, PRIMARY KEY (N, g));
+"""
+
+
+class FactorizationStore:
+    def __init__(self, maxsize: int = 4096, path: str = None, bypass: bool = False):
+        """ maxsize bounds the number of entries kept in memory.
+        path enables the SQLite tier (None keeps the store memory only);
+        RESULT_STORE_PATH is the conventional location.
+        bypass=True turns every lookup into a miss and every write into a no-op,
+        for honest timing runs that still pass a store around. """
+        self.maxsize = maxsize
+        self.path = path
+        self.bypass = bypass
+        self._entries = OrderedDict()  # ('N', N) or ('period', N, g) -> value
+        self._lock = Lock()
+        self._connection = None
+        self._connection_pid = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # connections and locks cannot be pickled (e.g. into pool workers);
+        # each process reopens the database on first use
+        state = self.__dict__.copy()
+        state['_lock'] = None
+        state['_connection'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    def _db(self):
+        """ SQLite connection for this process, opened on first use. """
+        if self._connection is None or self._connection_pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.executescript(_SCHEMA)
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _get(self, key, query, params, decode):
+        if self.bypass:
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            if self.path is not None:
+                row = self._db().execute(query, params).fetchone()
+                if row is not None:
+                    value = decode(row)
+                    self._remember(key, value)
+                    self.disk_hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def _put(self, key, value, query, params):
+        if self.bypass:
+            return
+        with self._lock:
+            self._remember(key, value)
+            if self.path is not None:
+                with self._db() as db:
+                    db.execute(query, params)
+
+    def get(self, N: int = None):
+        """ {'factors': {'p': p, 'q': q}, 'attempts': a} stored for N, or None. """
+        return self._get(
+            ('N', N),
+            'SELECT p, q, attempts FROM factorizations WHERE N = ?', (str(N),),
+            lambda row: {'factors': {'p': int(row[0]), 'q': int(row[1])}, 'attempts': row[2]},
+        )
+
+    def put(self, result: dict = None):
+        """ Remember a solver result; results without factors (e.g. timeouts) are ignored. """
+        factors = result.get('factors')
+        if not factors or factors.get('p') in (None, 1, result['N']):
+            return
+        N = result['N']
+        self._put(
+            ('N', N), {'factors': dict(factors), 'attempts': result.get('attempts')},
+            'INSERT OR REPLACE INTO factorizations VALUES (?, ?, ?, ?)',
+            (str(N), str(factors['p']), str(factors['q']), result.get('attempts')),
+        )
+
+    def get_period(self, g: int = None, N: int = None):
+        """ Period stored for guess g mod N, or None. """
+        return self._get(
+            ('period', N, g),
+            'SELECT r FROM periods WHERE N = ? AND g = ?', (str(N), str(g)),
+            lambda row: int(row[0]),
+        )
+
+    def put_period(self, g: int = None, N: int = None, r: int = None):
+        self._put(
+            ('period', N, g), r,
+            'INSERT OR REPLACE INTO periods VALUES (?, ?, ?)', (str(N), str(g), str(r)),
+        )
+
+    def info(self):
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+        }
+
+    def clear(self):
+        """ Drop the in-memory entries and, if persistent, the database rows. """
+        with self._lock:
+            self._entries.clear()
+            if self.path is not None:
+                with self._db() as db:
+                    db.execute('DELETE FROM factorizations')
+                    db.execute('DELETE FROM periods')
@@ -0,0 +1,118 @@
+""" Per-stage timing spans and an opt-in profiling hook.
+
+A StageTimer hands out context-manager spans timed with perf_counter_ns and
+aggregates them per stage, both over the whole run and per attempt:
+
+    timer = StageTimer(enabled=True)
+    timer.start_attempt()
+    with timer.span('transpile'):
+        ...
+    timer.report()
+    # {'stages': {'transpile': {'calls': 1, 'total_ms': ...}}, 'attempts': [{'transpile': ...}]}
+
+A disabled timer returns one shared no-op context manager from span(), so
+instrumented code costs a method call and an attribute check per span.
+"""
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from base import LOG_FOLDER_PATH
+
+_DISABLED_SPAN = nullcontext()
+
+
+class _Span:
+    __slots__ = ('timer', 'stage', 'start')
+
+    def __init__(self, timer, stage: str = None):
+        self.timer = timer
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.stage, time.perf_counter_ns() - self.start)
+        return False
+
+
+class StageTimer:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """ Forget all recorded spans (e.g. at the start of a factor() call). """
+        self.totals = {}  # stage -> [calls, total_ns]
+        self.attempts = []  # one {stage: total_ns} dict per attempt
+        self._current = threading.local()
+
+    def start_attempt(self):
+        """ Spans recorded from now on by this thread are also attributed to a new
+        attempt, so attempts running concurrently in a thread pool stay separate. """
+        if self.enabled:
+            attempt = {}
+            with self._lock:
+                self.attempts.append(attempt)
+            self._current.attempt = attempt
+
+    def span(self, stage: str = None):
+        """ Context manager timing one occurrence of stage. """
+        if not self.enabled:
+            return _DISABLED_SPAN
+        return _Span(self, stage)
+
+    def add(self, stage: str = None, elapsed_ns: int = 0):
+        attempt = getattr(self._current, 'attempt', None)
+        with self._lock:
+            total = self.totals.setdefault(stage, [0, 0])
+            total[0] += 1
+            total[1] += elapsed_ns
+            if attempt is not None:
+                attempt[stage] = attempt.get(stage, 0) + elapsed_ns
+
+    def merge(self, other=None):
+        """ Add the spans and attempts recorded by another timer (e.g. the private
+        timer of one concurrent attempt) to this one. """
+        with self._lock:
+            for stage, (calls, total_ns) in other.totals.items():
+                total = self.totals.setdefault(stage, [0, 0])
+                total[0] += calls
+                total[1] += total_ns
+            self.attempts.extend(other.attempts)
+
+    def report(self):
+        """ Aggregated timings in milliseconds: per stage over the run and per attempt. """
+        return {
+            'stages': {
+                stage: {'calls': calls, 'total_ms': total_ns / 1e6}
+                for stage, (calls, total_ns) in self.totals.items()
+            },
+            'attempts': [
+                {stage: total_ns / 1e6 for stage, total_ns in attempt.items()}
+                for attempt in self.attempts
+            ],
+        }
+
+
+@contextmanager
+def profiled(name: str = 'profile', enabled: bool = True, folder: str = LOG_FOLDER_PATH):
+    """ Run the with-block under cProfile and dump the stats to
+    <folder>/<name>-<timestamp>.prof, next to the log files. Load the dump with
+    pstats.Stats(path) or a viewer such as snakeviz. Does nothing when disabled. """
+    if not enabled:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f'{name}-{time.strftime("%Y%m%d-%H%M%S")}.prof')
+        profiler.dump_stats(path)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from qskt.emulator import PermutationStateEmulator
+from qskt.oracle import AnalyticPhaseOracle
+
+
+def dense_distribution(g, N, n_count):
+    # counting state |k> paired with work value g^k mod N, then the inverse QFT per work value
+    M = 2 ** n_count
+    values = sorted({pow(g, k, N) for k in range(M)})
+    state = np.zeros((M, len(values)), dtype=complex)
+    for k in range(M):
+        state[k, values.index(pow(g, k, N))] = 1 / np.sqrt(M)
+    amplitudes = np.fft.fft(state, axis=0) / np.sqrt(M)
+    return (np.abs(amplitudes) ** 2).sum(axis=1)
+
+
+@pytest.mark.parametrize('g, N', [(2, 15), (7, 15), (2, 21), (4, 21), (5, 33), (2, 77), (3, 221)])
+@pytest.mark.parametrize('n_count', [1, 3, 6, 9])
+def test_emulator_matches_dense_statevector(g, N, n_count):
+    probabilities = PermutationStateEmulator(seed=0).probabilities(g, N, n_count)
+    np.testing.assert_allclose(probabilities, dense_distribution(g, N, n_count), atol=1e-12)
+
+
+def test_emulator_large_order_stays_small():
+    # 2 has order 41832 mod 1009 * 997: the dense state would be 2^20 x 41832 complex entries
+    probabilities = PermutationStateEmulator(seed=0).probabilities(2, 1009 * 997, 20)
+    assert probabilities.shape == (2 ** 20,)
+    assert abs(probabilities.sum() - 1) < 1e-9
+
+
+def test_emulator_readings_follow_the_period():
+    # 2 has order 4 mod 15, so an 8 bit reading is a multiple of 256 / 4
+    readings = PermutationStateEmulator(seed=1).run(2, 15, n_count=8, shots=50)
+    assert all(len(reading) == 8 and int(reading, 2) % 64 == 0 for reading in readings)
+
+
+@pytest.mark.parametrize('g, N, n_count', [(2, 15, 4), (2, 21, 6), (5, 33, 7), (3, 221, 8)])
+def test_analytic_oracle_samples_the_exact_distribution(g, N, n_count):
+    shots = 20000
+    readings = AnalyticPhaseOracle(seed=7).run(g, N, n_count=n_count, shots=shots)
+    counts = np.bincount([int(reading, 2) for reading in readings], minlength=2 ** n_count)
+    expected = shots * dense_distribution(g, N, n_count)
+    # every reading's count within 5 standard deviations of its exact expectation
+    assert np.all(np.abs(counts - expected) <= 5 * np.sqrt(expected) + 1)
@@ -0,0 +1,46 @@
+import random
+import pytest
+from classical.engines import ECMFactorization, PollardBrentFactorization, TrialDivisionFactorization
+
+SEMIPRIMES = [15, 77, 3127, 10403, 1022117, 999983 * 1000003, 2147483647 * 2305843009213693951]
+
+
+@pytest.fixture(autouse=True)
+def seeded_random():
+    # the engines draw their starting points from the random module
+    random.seed(12345)
+
+
+def assert_splits(result, N):
+    p, q = result['factors']['p'], result['factors']['q']
+    assert p * q == N and 1 < p < N
+
+
+@pytest.mark.parametrize('N', SEMIPRIMES)
+def test_pollard_brent_splits_semiprimes(N):
+    assert_splits(PollardBrentFactorization().factor(N), N)
+
+
+def test_brent_returns_a_divisor():
+    N = 10403  # 101 * 103
+    d = PollardBrentFactorization().brent(N, c=1, y=2)
+    assert N % d == 0
+
+
+@pytest.mark.parametrize('N', SEMIPRIMES[:-1])
+def test_ecm_splits_semiprimes(N):
+    assert_splits(ECMFactorization().factor(N), N)
+
+
+def test_ecm_leaves_primes_and_even_numbers_alone():
+    ecm = ECMFactorization()
+    assert ecm.factor(1000003)['factors'] == {'p': 1000003, 'q': 1}
+    assert ecm.factor(2 * 1000003)['factors'] == {'p': 2, 'q': 1000003}
+    assert ecm.factor(1000003)['attempts'] == 0
+
+
+@pytest.mark.parametrize('N', [15, 77, 3127, 1022117])
+def test_trial_division(N):
+    result = TrialDivisionFactorization().factor(N)
+    assert_splits(result, N)
+    assert result['factors']['p'] <= result['factors']['q']
@@ -0,0 +1,35 @@
+from math import gcd
+import pytest
+from classical.order import auto_order, baby_step_giant_step_order, get_order_finding_engine, incremental_order
+
+
+@pytest.mark.parametrize('N', [15, 21, 77, 221, 3127, 10403, 65537, 1022117])
+def test_baby_step_giant_step_matches_incremental_order(N):
+    bases = [g for g in range(2, min(N, 40)) if gcd(g, N) == 1]
+    for g in bases:
+        r = incremental_order(g, N)
+        assert baby_step_giant_step_order(g, N) == r
+        assert auto_order(g, N) == r
+        assert pow(g, r, N) == 1
+
+
+def test_known_orders():
+    assert incremental_order(2, 15) == 4
+    assert incremental_order(7, 15) == 4
+    assert incremental_order(2, 21) == 6
+    assert baby_step_giant_step_order(3, 65537) == 65536  # 3 is a primitive root of the Fermat prime
+    assert baby_step_giant_step_order(1, 77) == 1
+
+
+@pytest.mark.parametrize('order', [incremental_order, baby_step_giant_step_order])
+def test_orders_reject_bases_sharing_a_factor(order):
+    with pytest.raises(ValueError):
+        order(3, 15)
+
+
+def test_get_order_finding_engine():
+    assert get_order_finding_engine('auto') is auto_order
+    assert get_order_finding_engine('bsgs') is baby_step_giant_step_order
+    assert get_order_finding_engine(incremental_order) is incremental_order
+    with pytest.raises(ValueError):
+        get_order_finding_engine('shor')
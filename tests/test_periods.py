@@ -0,0 +1,33 @@
+from fractions import Fraction
+from utils.periods import candidate_periods, factors_from_period
+
+
+def test_factors_from_period_splits_n():
+    assert sorted(factors_from_period(g=7, r=4, N=15).values()) == [3, 5]
+    assert sorted(factors_from_period(g=2, r=6, N=21).values()) == [3, 7]
+    assert sorted(factors_from_period(g=2, r=4, N=15).values()) == [3, 5]
+
+
+def test_factors_from_period_rejects_unusable_periods():
+    assert factors_from_period(g=4, r=3, N=21) is None  # odd period
+    assert factors_from_period(g=14, r=2, N=15) is None  # 14 = -1 mod 15
+    assert factors_from_period(g=2, r=None, N=15) is None
+
+
+def test_candidate_periods_from_exact_phases():
+    assert candidate_periods([Fraction(1, 4), Fraction(3, 4)], 15) == [4]
+    assert candidate_periods([0.0, 0.0], 15) == []
+
+
+def test_candidate_periods_recovers_r_from_partial_readings():
+    # phases 2/6 and 3/6 only reveal 3 and 2; their lcm is the period
+    candidates = candidate_periods([Fraction(2, 6), Fraction(3, 6)], 21)
+    assert candidates == [2, 3, 6]
+    assert factors_from_period(g=2, r=candidates[-1], N=21) is not None
+
+
+def test_candidate_periods_limits_denominators_to_n():
+    # an 8 bit reading of 1/6 is 43/256; limit_denominator(21) snaps it back to 1/6
+    assert candidate_periods([43 / 256], 21) == [6]
+    # lcms that reach N are dropped
+    assert candidate_periods([Fraction(1, 5), Fraction(1, 3)], 15) == [3, 5]
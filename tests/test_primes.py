@@ -0,0 +1,44 @@
+import pytest
+from utils.primes import _sieve, is_probable_prime, jacobi, small_primes
+
+
+def test_miller_rabin_matches_the_sieve():
+    primes = set(_sieve(20000))
+    assert [n for n in range(-5, 20000) if is_probable_prime(n)] == sorted(primes)
+
+
+@pytest.mark.parametrize('n', [561, 1105, 1729, 2047, 3215031751, 341550071728321, 3825123056546413051])
+def test_miller_rabin_rejects_pseudoprimes(n):
+    # Carmichael numbers and strong pseudoprimes to several small bases
+    assert not is_probable_prime(n)
+
+
+@pytest.mark.parametrize('n', [1000003, 2 ** 61 - 1, 2 ** 89 - 1, 10 ** 18 + 9])
+def test_miller_rabin_accepts_large_primes(n):
+    assert is_probable_prime(n)
+
+
+@pytest.mark.parametrize('p', [3, 5, 7, 11, 101, 1009])
+def test_jacobi_matches_euler_criterion_for_primes(p):
+    for a in range(-p, 2 * p):
+        euler = pow(a, (p - 1) // 2, p)
+        assert jacobi(a, p) == (0 if a % p == 0 else 1 if euler == 1 else -1)
+
+
+def test_jacobi_is_multiplicative_in_n():
+    for a in range(-30, 60):
+        for m in (3, 5, 7, 11):
+            for n in (3, 13, 15):
+                assert jacobi(a, m * n) == jacobi(a, m) * jacobi(a, n)
+    assert jacobi(2, 15) == 1 and jacobi(7, 15) == -1 and jacobi(5, 15) == 0
+
+
+@pytest.mark.parametrize('n', [0, -3, 4, 10])
+def test_jacobi_rejects_even_or_non_positive_n(n):
+    with pytest.raises(ValueError):
+        jacobi(3, n)
+
+
+def test_small_primes_below_limit():
+    assert small_primes(30) == [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    assert small_primes(29) == [2, 3, 5, 7, 11, 13, 17, 19, 23]
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('qiskit')
+pytest.importorskip('qiskit_aer')
+from qiskit import transpile
+from qskt.emulator import PermutationStateEmulator
+from qskt.qpe import QuantumPhaseEstimator
+
+
+@pytest.mark.parametrize('qft_mode', ['full', 'semiclassical'])
+def test_dense_multipliers_stay_native_unitaries(qft_mode):
+    qpe = QuantumPhaseEstimator(backend='aer', multiplier='unitary', qft_mode=qft_mode)
+    circuit = qpe.build_circuit(g=2, N=21, n_count=6)
+    ops = dict(transpile(circuit, qpe.aer_sim).count_ops())
+    assert ops['unitary'] == 6
+    assert 'cx' not in ops and 'u' not in ops
+    labels = [instruction.operation.label for instruction in circuit.data
+              if instruction.operation.name == 'unitary']
+    assert 'c-2^1 mod 21' in labels
+
+
+def counting_distribution(circuit, n_count):
+    from qiskit.quantum_info import Statevector
+    state = Statevector(circuit.remove_final_measurements(inplace=False))
+    return state.probabilities(range(n_count))
+
+
+@pytest.mark.parametrize('g', [2, 7, 11])
+def test_adder_multiplier_matches_unitary_multiplier(g):
+    N, n_count = 15, 3
+    unitary = QuantumPhaseEstimator(backend='aer', multiplier='unitary').build_circuit(g=g, N=N, n_count=n_count)
+    adder = QuantumPhaseEstimator(backend='aer', multiplier='adder').build_circuit(g=g, N=N, n_count=n_count)
+    assert adder.num_qubits == unitary.num_qubits + 6  # n + 2 ancillas for n = 4 work qubits
+    expected = PermutationStateEmulator().probabilities(g, N, n_count)
+    np.testing.assert_allclose(counting_distribution(unitary, n_count), expected, atol=1e-9)
+    np.testing.assert_allclose(counting_distribution(adder, n_count), expected, atol=1e-9)
+
+
+def test_adder_multiplier_on_basis_states():
+    from qiskit.quantum_info import Statevector
+    from qskt.multiplier import controlled_multiplier
+    N, a, n = 15, 7, 4
+    circuit = controlled_multiplier(a=a, N=N, num_qubits=n)
+    for control in (0, 1):
+        for x in range(N):
+            # qubit 0 is the control, qubits 1..n the work register, the ancillas start at 0
+            state = Statevector.from_int(control + 2 * x, 2 ** circuit.num_qubits).evolve(circuit)
+            expected = control + 2 * (a * x % N if control else x)
+            assert abs(state.data[expected]) ** 2 > 1 - 1e-9
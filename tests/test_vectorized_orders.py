@@ -0,0 +1,59 @@
+from math import gcd
+import random
+import pytest
+from classical.order import incremental_order, vectorized_orders
+from classical.solver import ClassicalPrimeFactorization
+
+
+def coprime_bases(N, count, rng):
+    bases = []
+    while len(bases) < count:
+        g = rng.randrange(2, N - 1)
+        if gcd(g, N) == 1:
+            bases.append(g)
+    return bases
+
+
+@pytest.mark.parametrize('N', [15, 21, 77, 3127, 10403, 65537, 1022117])
+def test_vectorized_orders_match_incremental_order(N):
+    bases = coprime_bases(N, 20, random.Random(N))
+    assert vectorized_orders(bases, N) == [incremental_order(g, N) for g in bases]
+
+
+def test_vectorized_orders_with_one_modulus_per_base():
+    bases, moduli = [2, 2, 3, 5, 10, 7, 5], [15, 21, 35, 3127, 77, 1022117, 1000003]
+    assert vectorized_orders(bases, moduli) == [incremental_order(g, N) for g, N in zip(bases, moduli)]
+
+
+def test_vectorized_orders_rejects_bad_input():
+    assert vectorized_orders([], 15) == []
+    with pytest.raises(ValueError):
+        vectorized_orders([3], 15)
+    with pytest.raises(ValueError):
+        vectorized_orders([3], 1 << 33)
+
+
+def test_factor_batch_agrees_with_factor():
+    numbers = [15, 21, 33, 35, 49, 3127, 10403, 1022117, 2 * 7919, 999983 * 1009, 15, 3127]
+    batch = ClassicalPrimeFactorization(seed=1).factor_batch(numbers)
+    solver = ClassicalPrimeFactorization(seed=1)
+    assert [result['N'] for result in batch] == numbers
+    for N, result in zip(numbers, batch):
+        single = solver.factor(N)
+        assert sorted(result['factors'].values()) == sorted(single['factors'].values())
+        assert result['factors']['p'] * result['factors']['q'] == N
+    # repeated N get their own dicts, down to the factors
+    assert batch[0] == batch[-2] and batch[0] is not batch[-2]
+    assert batch[0]['factors'] is not batch[-2]['factors']
+
+
+def test_factor_batch_uses_common_factor_bases():
+    # every base drawn for 3 * 5 is likely to share a factor with it
+    results = ClassicalPrimeFactorization(seed=3).factor_batch([15] * 3, bases_per_number=8)
+    assert all(sorted(result['factors'].values()) == [3, 5] for result in results)
+
+
+def test_factor_batch_timings_are_not_shared():
+    results = ClassicalPrimeFactorization(seed=1, timings=True).factor_batch([3127, 10403, 2 * 3127])
+    assert 'timings' not in results[0] and 'timings' not in results[1]
+    assert 'timings' in results[2]